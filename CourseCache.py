@@ -1,42 +1,189 @@
 import json
 import os
-from fake_datetime import datetime
+from collections import ChainMap
+from section_record import SectionRecord
+from term_calendar import TermCalendar
+
+
+def resolve_cache_path(path):
+    # Construct path relative to this file
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_dir, path)
+
+
+def _compact_object_hook(d):
+    # called on every json object as it's parsed (innermost first), so each section dict is converted and freed right away
+    if SectionRecord.is_section_dict(d):
+        try:
+            return SectionRecord.from_dict(d)
+        except ValueError:
+            return d  # doesn't fit the compact layout, keep it as is
+    return d
+
+
+def _to_json(obj):
+    if isinstance(obj, SectionRecord):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def iter_cache_file(path, chunk_size=1 << 16, compact=False):
+    """Reads a cache file (the json CourseCache.save() writes) one course at a time, without loading all of it
+
+    Args:
+        path (str): cache file, relative to this file like CourseCache's path
+        chunk_size (int, optional): how much of the file to read at once
+        compact (bool, optional): yield sections as SectionRecords, like CourseCache(compact=True)
+
+    Yields:
+        tuple: (course_code, cache entry) in file order
+    """
+    path = resolve_cache_path(path)
+    if not os.path.exists(path):
+        return  # same as CourseCache._load, a missing cache is an empty cache
+
+    decoder = json.JSONDecoder(object_hook=_compact_object_hook if compact else None)
+    with open(path, "r", encoding="utf-8") as f:
+        buf = f.read(chunk_size)
+        pos = 0
+
+        def refill():
+            # returns False at end of file. reads at least as much as is buffered, so huge entries don't go quadratic
+            nonlocal buf, pos
+            more = f.read(max(chunk_size, len(buf) - pos))
+            buf = buf[pos:] + more
+            pos = 0
+            return bool(more)
+
+        def next_char():
+            # skips whitespace and returns the next character without consuming it ("" at end of file)
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos].isspace():
+                    pos += 1
+                if pos < len(buf) or not refill():
+                    return buf[pos:pos + 1]
+
+        def decode():
+            nonlocal pos
+            while True:
+                try:
+                    value, pos = decoder.raw_decode(buf, pos)
+                    return value
+                except json.JSONDecodeError:
+                    if not refill():  # genuinely malformed, not just cut off by the chunk boundary
+                        raise
+
+        if next_char() != "{":
+            raise ValueError(f"{path} is not a cache file (expected a json object)")
+        pos += 1
+        if next_char() == "}":
+            return
+
+        while True:
+            next_char()
+            key = decode()
+            if next_char() != ":":
+                raise ValueError(f"{path} is malformed near course {key}")
+            pos += 1
+            next_char()
+            yield key, decode()
+
+            c = next_char()
+            pos += 1
+            if c == "}":
+                return
+            if c != ",":
+                raise ValueError(f"{path} is malformed after course {key}")
+
+
+def format_cache_entry(course_code, entry):
+    """Serializes one course exactly like it appears inside json.dump(data, indent=2), which is what CourseCache.save() writes"""
+    # json.dumps never puts a raw newline inside a string, so indenting every line is safe
+    return "  " + json.dumps(course_code) + ": " + json.dumps(entry, indent=2, default=_to_json).replace("\n", "\n  ")
+
+
+class CacheFileWriter:
+    """
+    Writes a cache file one course at a time. Output is identical to CourseCache.save() with the same data.
+    Writes to a temporary file and only replaces path on a clean exit, so path can also be the file being read.
+    """
+    def __init__(self, path):
+        self.path = resolve_cache_path(path)
+        self._tmp_path = self.path + ".tmp"
+        self._file = None
+        self._count = 0
+
+    def __enter__(self):
+        self._file = open(self._tmp_path, "w", encoding="utf-8")
+        return self
+
+    def write(self, course_code, entry):
+        self.write_formatted(format_cache_entry(course_code, entry))
+
+    def write_formatted(self, formatted_entry):
+        self._file.write(("{\n" if self._count == 0 else ",\n") + formatted_entry)
+        self._count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._file.write("\n}" if self._count else "{}")
+        finally:
+            self._file.close()
+        if exc_type is None:
+            os.replace(self._tmp_path, self.path)
+        else:
+            os.remove(self._tmp_path)
+        return False
+
+
+def merged_entry_view(entries):
+    """Combines several cache entries (cross-listings of one course) without copying any section data
+
+    Args:
+        entries (list): cache entries, the first one's metadata wins where they can't be combined
+
+    Returns:
+        dict: a (cache entry)-style object whose periods are ChainMaps over the original entries' periods
+    """
+    first = entries[0]['metadata']
+    metadata = dict(first)
+    for key in ("failed_periods", "relevant_periods"):
+        metadata[key] = list(dict.fromkeys(p for e in entries for p in e['metadata'][key]))
+    amended = list(dict.fromkeys(s for e in entries for s in e['metadata'].get('amended_sections', [])))
+    if amended:
+        metadata['amended_sections'] = amended
+
+    periods = dict.fromkeys(p for e in entries for p in e['data'])
+    data = {p: ChainMap(*[e['data'][p] for e in entries if p in e['data']]) for p in periods}
+    return {"metadata": metadata, "data": data}
+
 
 class CourseCache:
-    def __init__(self, path="cache.json", years=5):
-        # Construct path relative to this file
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        self.path = os.path.join(base_dir, path)
-        self.periods = self._generate_periods(years)
+    def __init__(self, path="cache.json", years=5, compact=False, aliases=None, failure_index=None, calendar=None):
+        """
+        Args:
+            path (str, optional): cache file, relative to this file
+            years (int, optional): how many years of periods to track
+            compact (bool, optional): hold sections in memory as SectionRecords instead of dicts.
+                                      Much less RAM for big caches; the file on disk is the same either way.
+            aliases (AliasIndex, optional): if given, get_course()/iter_courses() combine cross-listed codes
+            failure_index (FailureIndex, optional): if given, failed periods are recorded there too and it's saved with the cache
+            calendar (TermCalendar, optional): what "now" is, defaults to TermCalendar() (fake_datetime)
+        """
+        self.path = resolve_cache_path(path)
+        self.compact = compact
+        self.aliases = aliases
+        self.failure_index = failure_index
+        self.calendar = TermCalendar() if calendar is None else calendar
+        self.periods = self.calendar.recent_terms(years)
         self.data = self._load()
 
-    def _generate_periods(self, years):
-        now = datetime.now()
-
-        # Determine final period
-        last_year = now.year - 1
-        last_period = "FA"
-        if now.month > 5:  # After May, consider SP of this year to be included
-            last_year += 1
-            last_period = "SP"
-
-        # Build list of all periods going backward
-        seasons = ["SP", "FA"]
-        all_periods = []
-        total_periods = 2 * years
-        first = True
-        while len(all_periods) < total_periods:
-            for season in reversed(seasons):  # FA, then SP (so newer first)
-                if first and last_period == "SP":
-                    first = False
-                    continue  # to make the most recent period in this list spring, not fall
-                if len(all_periods) < total_periods:
-                    all_periods.insert(0, f"{season}{str(last_year)[2:]}")
-            last_year -= 1
-
-        return all_periods
-
     def _load(self):
+        if self.compact:
+            # streaming, so the whole file is never in memory as one string either
+            return dict(iter_cache_file(self.path, compact=True))
         if os.path.exists(self.path):
             with open(self.path, "r", encoding="utf-8") as f:
                 return json.load(f)
@@ -45,10 +192,34 @@ class CourseCache:
 
     def save(self):
         with open(self.path, "w", encoding="utf-8") as f:
-            json.dump(self.data, f, indent=2)
+            json.dump(self.data, f, indent=2, default=_to_json)
+        if self.failure_index is not None:
+            self.failure_index.save(self.path)
 
     def get_course(self, course_code):
-        return self.data.get(course_code, None)
+        if self.aliases is None:
+            return self.data.get(course_code, None)
+
+        # any code of a cross-listed course gives the combined entry
+        entries = [self.data[code] for code in self.aliases.members(course_code) if code in self.data]
+        if not entries:
+            return None
+        if len(entries) == 1:
+            return entries[0]
+        return merged_entry_view(entries)
+
+    def iter_courses(self):
+        """Yields (course_code, entry) for every course, with cross-listings combined under their canonical code"""
+        if self.aliases is None:
+            yield from self.data.items()
+            return
+
+        seen = set()
+        for code in self.data:
+            canonical = self.aliases.resolve(code)
+            if canonical not in seen:
+                seen.add(canonical)
+                yield canonical, self.get_course(canonical)
 
     def ensure_course(self, course_code, period=None):
         if course_code not in self.data:
@@ -66,8 +237,20 @@ class CourseCache:
         elif period is not None and period not in self.data[course_code]['data']:
             self.data[course_code]['data'][period] = {}
             self.data[course_code]['metadata']['failed_periods'].append(period)
+        else:
+            return
+        if period is not None and self.failure_index is not None:
+            self.failure_index.record(course_code, period, 1, attempts=0)  # stays pending until resolve_failed(), nothing tried yet
+
+    def resolve_failed(self, course_code, period):
+        """Marks every section of a period as gathered (nothing left to retry)"""
+        failed = self.data[course_code]['metadata']['failed_periods']
+        if period in failed:
+            failed.remove(period)
+        if self.failure_index is not None:
+            self.failure_index.resolve(course_code, period)
 
-    def mark_failed(self, full_code, intersession=False, summer=False):
+    def mark_failed(self, full_code, intersession=False, summer=False, kind="unknown", attempts=1):
         assert(not (intersession and summer))
         period = full_code.split(".")[4]
         general = ".".join(full_code.split(".")[:3]) + ("|IN" if intersession else ("|SU" if summer else ""))
@@ -80,4 +263,6 @@ class CourseCache:
             md["failed_periods"].append(period)
         if period not in md["relevant_periods"]:
             md["relevant_periods"].append(period)
+        if self.failure_index is not None:
+            self.failure_index.record(general, period, int(full_code.split(".")[3]), kind, attempts)
 
@@ -0,0 +1,96 @@
+"""
+Builds fake caches in the same shape as cache.json, so the benchmarks don't need real scraped data (or a network).
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+
+# the benchmarks live one directory down from the modules they measure
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from CourseCache import CourseCache
+
+INSTRUCTORS = ["Ada Lovelace", "Alan Turing", "Grace Hopper", "Edsger Dijkstra", "Barbara Liskov", "Donald Knuth"]
+QUALITY_LABELS = ["Poor", "Weak", "Satisfactory", "Good", "Excellent"]
+FEEDBACK_LABELS = ["Disagree strongly", "Disagree somewhat", "Neither agree nor disagree", "Agree somewhat", "Agree strongly"]
+WORKLOAD_LABELS = ["Much lighter", "Somewhat lighter", "Typical", "Somewhat heavier", "Much heavier"]
+
+
+def _frequency(rng, labels):
+    return {label: rng.randint(0, 30) for label in labels}
+
+
+def make_section(rng, specific_code):
+    return {
+        "course_name": f"Course {specific_code[:10]}",
+        "instructor_name": rng.choice(INSTRUCTORS),
+        "overall_quality_frequency": _frequency(rng, QUALITY_LABELS),
+        "instructor_effectiveness_frequency": _frequency(rng, QUALITY_LABELS),
+        "intellectual_challenge_frequency": _frequency(rng, QUALITY_LABELS),
+        "ta_frequency": _frequency(rng, QUALITY_LABELS),
+        "ta_names": [f"TA {i}" for i in range(rng.randint(0, 3))],
+        "feedback_frequency": _frequency(rng, FEEDBACK_LABELS),
+        "workload_frequency": _frequency(rng, WORKLOAD_LABELS),
+    }
+
+
+def make_cache_data(n_courses=200, max_sections=4, seed=0):
+    """Creates cache data (the CourseCache.data dict) for n_courses fully up to date courses
+
+    Args:
+        n_courses (int, optional): number of general course codes
+        max_sections (int, optional): each relevant period gets between 1 and this many sections
+        seed (int, optional): seed for the random frequencies, so runs are comparable
+
+    Returns:
+        dict: CourseCache.data-style dict
+    """
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        periods = CourseCache(os.path.join(tmp, "empty.json")).periods  # nothing to load, just want the periods
+
+    data = {}
+    for i in range(n_courses):
+        code = f"EN.{500 + i // 1000:03}.{i % 1000:03}"
+        relevant = [p for p in periods if rng.random() < 0.7]
+        data[code] = {
+            "metadata": {
+                "failed_periods": [],
+                "first_period_gathered": periods[0],
+                "last_period_gathered": periods[-1],
+                "relevant_periods": relevant,
+                "intersession": None,
+                "summer": None
+            },
+            "data": {
+                p: {
+                    f"{code}.{sec:02}.{p}": make_section(rng, f"{code}.{sec:02}.{p}")
+                    for sec in range(1, rng.randint(1, max_sections) + 1)
+                } if p in relevant else {}
+                for p in periods
+            }
+        }
+    # one course that never ran, so create_nice_cache has something to drop
+    data["EN.999.999"] = {
+        "metadata": {
+            "failed_periods": [],
+            "first_period_gathered": periods[0],
+            "last_period_gathered": periods[-1],
+            "relevant_periods": [],
+            "intersession": None,
+            "summer": None
+        },
+        "data": {p: {} for p in periods}
+    }
+    return data
+
+
+def write_cache(path, n_courses=200, max_sections=4, seed=0):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(make_cache_data(n_courses, max_sections, seed), f, indent=2)
+    return path
@@ -0,0 +1,57 @@
+"""
+Memory benchmark: the same synthetic cache held by CourseCache as dicts (the default) vs as SectionRecords (compact=True).
+Also checks that saving a compact cache writes exactly the same file. Usage:
+    python benchmarks/memory.py [--courses 2000]
+"""
+
+import argparse
+import filecmp
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from _synthetic import write_cache
+from CourseCache import CourseCache
+
+
+def _measure(path, compact):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    cache = CourseCache(path, compact=compact)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cache, current, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_cache(os.path.join(tmp, "cache.json"), n_courses=args.courses)
+        n_sections = sum(len(sections) for entry in CourseCache(path).data.values() for sections in entry["data"].values())
+        print(f"{args.courses} courses, {n_sections} sections, {os.path.getsize(path) / 2**20:.1f} MiB on disk\n")
+
+        print(f"{'layout':<10} {'resident (MiB)':>15} {'peak (MiB)':>11} {'bytes/section':>14} {'load (s)':>9}")
+        results = {}
+        for name, compact in (("dict", False), ("compact", True)):
+            cache, current, peak, elapsed = _measure(path, compact)
+            results[name] = current
+            print(f"{name:<10} {current / 2**20:>15.1f} {peak / 2**20:>11.1f} {current / n_sections:>14.0f} {elapsed:>9.2f}")
+
+            cache.path = os.path.join(tmp, f"{name}_saved.json")
+            cache.save()
+            del cache
+
+        print(f"\ncompact uses {results['compact'] / results['dict']:.0%} of the dict layout's memory")
+        same = filecmp.cmp(os.path.join(tmp, "dict_saved.json"), os.path.join(tmp, "compact_saved.json"), shallow=False)
+        print(f"saved files identical: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Cold-start benchmark for the tools that shouldn't need selenium/requests/pdfplumber:
+cached lookups through GeneralClassScraper, offline aggregation (main.aggregate_entry), and create_nice_cache.
+
+Every scenario runs in a fresh interpreter, so import time is included. Usage:
+    python benchmarks/startup.py [--courses 200] [--repeat 5]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from _synthetic import REPO_DIR, write_cache
+
+HEAVY_MODULES = ["seleniumwire", "selenium", "requests", "pdfplumber"]
+
+SCENARIOS = {
+    "python startup (baseline)": "pass",
+    "cached lookup": (
+        "from CourseCache import CourseCache\n"
+        "from page_parse import GeneralClassScraper\n"
+        "GeneralClassScraper('EN.500.000', CourseCache(CACHE)).scrape_all_pdfs()\n"
+    ),
+    "offline aggregation": (
+        "from CourseCache import CourseCache\n"
+        "import main\n"
+        "cache = CourseCache(CACHE)\n"
+        "for code in cache.data:\n"
+        "    main.aggregate_entry(cache.get_course(code))\n"
+    ),
+    "create_nice_cache": (
+        "from create_nice_cache import make_cache_nice\n"
+        "make_cache_nice(CACHE, OUTPUT)\n"
+    ),
+}
+
+
+def _run(snippet, cache_path, output_path):
+    # report which heavy modules were imported, so a regression is obvious even when the timing is noisy
+    program = (
+        f"CACHE = {cache_path!r}\nOUTPUT = {output_path!r}\n"
+        + snippet
+        + f"\nimport sys\nprint(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", program], cwd=REPO_DIR, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"scenario failed:\n{result.stderr}")
+    return elapsed, result.stdout.strip().splitlines()[-1] if result.stdout.strip() else ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = write_cache(os.path.join(tmp, "cache.json"), n_courses=args.courses)
+        output_path = os.path.join(tmp, "nice_cache.json")
+
+        print(f"{'scenario':<28} {'min (s)':>8} {'median (s)':>11}  heavy modules loaded")
+        for name, snippet in SCENARIOS.items():
+            times = []
+            loaded = ""
+            for _ in range(args.repeat):
+                elapsed, loaded = _run(snippet, cache_path, output_path)
+                times.append(elapsed)
+            print(f"{name:<28} {min(times):>8.3f} {statistics.median(times):>11.3f}  {loaded or '-'}")
+
+
+if __name__ == "__main__":
+    main()
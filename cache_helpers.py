@@ -1,35 +1,75 @@
 from CourseCache import CourseCache
 
-def combine_entries(entry1: str, entry2: str, cache_file: str=None) -> dict:
+
+def _merge_entry_into(e1: dict, e2: dict, problems: list, label: str=""):
+    """Moves every section in e2 into e1 (in place). Anything that doesn't merge cleanly is appended to problems instead of asserting"""
+    for period, specific_courses in e2['data'].items():
+        target = e1['data'].setdefault(period, {})
+        for specific_course, specific_course_entry in specific_courses.items():
+            if specific_course in target and target[specific_course] != specific_course_entry:
+                problems.append(f'{label}{specific_course} is in both entries with different data, kept the first')
+                continue
+            target[specific_course] = specific_course_entry
+
+    md1, md2 = e1['metadata'], e2['metadata']
+    md1['relevant_periods'] = list(dict.fromkeys(md1['relevant_periods'] + md2['relevant_periods']))
+    # failed periods carry over, so manage_failed_downloads.py still sees them
+    md1['failed_periods'] = list(dict.fromkeys(md1['failed_periods'] + md2['failed_periods']))
+    # so are sections flagged as amended since they were first downloaded
+    if md2.get('amended_sections'):
+        md1['amended_sections'] = list(dict.fromkeys(md1.get('amended_sections', []) + md2['amended_sections']))
+    for key in ('first_period_gathered', 'last_period_gathered'):
+        if md1[key] != md2[key]:
+            problems.append(f'{label}{key} differs ({md1[key]} vs {md2[key]}), kept {md1[key]}')
+
+
+def combine_entries(entry1: str, entry2: str, cache_file: str=None, cache: CourseCache=None) -> dict:
     """The purpose of this function is to deal with scenarios like CS 400 level and 600 level courses where the entries really should be combined
 
     Args:
         entry1 (str): CourseCache key, should be a course code or can be a course code with |IN or |SU at the end
         entry2 (str): the secondary entry. The above course code will be used, but all the values at this entry will be in the final entry
         cache_file (str, optional): if not specified, just cache.json, but you can use another file if you want
+        cache (CourseCache, optional): an already loaded cache to use instead of loading cache_file
 
     Returns:
         dict: a (cache entry)-style object
     """
-    cache = CourseCache() if cache_file is None else CourseCache(cache_file)
+    if cache is None:
+        cache = CourseCache() if cache_file is None else CourseCache(cache_file)
 
     e1 = cache.data[entry1]  # the default one
     e2 = cache.data[entry2]
 
-    rel1 = set(e1['metadata']['relevant_periods'])
-    rel2 = set(e2['metadata']['relevant_periods'])
-    for period in (rel1 & rel2):  # if no overlap, skip this, all is well
-        for specific_course, specific_course_entry in e2['data'][period].items():
-            assert(specific_course not in e1['data'][period])
-            e1['data'][period][specific_course] = specific_course_entry
-
-    e1['metadata']['relevant_periods'] = rel1 | rel2
-    assert(e1['metadata']['first_period_gathered'] == e2['metadata']['first_period_gathered'])
-    assert(e1['metadata']['last_period_gathered'] == e2['metadata']['last_period_gathered'])
-    assert(not e1['metadata']['failed_periods'] and not e2['metadata']['failed_periods'])
+    problems = []
+    _merge_entry_into(e1, e2, problems)
+    for problem in problems:
+        print(f'⚠️ {problem}')
 
     return e1
 
 
+def merge_aliases(cache: CourseCache, aliases) -> list:
+    """Folds every alias in an AliasIndex into its canonical entry, in one pass over the cache (in place, not saved)
+
+    Args:
+        cache (CourseCache): the cache to merge, aliased entries are removed from cache.data
+        aliases (AliasIndex): alias -> canonical course codes
+
+    Returns:
+        list: descriptions of anything that didn't merge cleanly (conflicting sections, mismatched periods gathered)
+    """
+    problems = []
+    for alias, canonical in aliases.aliases.items():
+        if alias not in cache.data:
+            continue
+        entry = cache.data.pop(alias)
+        if canonical not in cache.data:
+            cache.data[canonical] = entry  # nothing to merge with, the alias just gets renamed
+            continue
+        _merge_entry_into(cache.data[canonical], entry, problems, label=f'{alias} -> {canonical}: ')
+    return problems
+
+
 if __name__ == "__main__":
     print(combine_entries('EN.601.482', 'EN.601.682'))
@@ -0,0 +1,62 @@
+"""
+Persistent index of cross-listed course codes (alias -> canonical), e.g. EN.601.682 -> EN.601.482.
+
+CourseCache(aliases=AliasIndex()) resolves these on lookup, and cache_helpers.merge_aliases() can fold them into the cache for good.
+"""
+
+import json
+from CourseCache import resolve_cache_path
+
+
+class AliasIndex:
+    def __init__(self, path="aliases.json"):
+        self.path = resolve_cache_path(path)
+        self.aliases = self._load()  # alias -> canonical, always fully resolved (a canonical is never itself an alias)
+        self._members = None  # canonical -> [aliases], built on demand
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def save(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.aliases, f, indent=2, sort_keys=True)
+
+    def add(self, alias: str, canonical: str):
+        """Records that alias is the same course as canonical
+
+        Args:
+            alias (str): CourseCache key whose data should be treated as canonical's
+            canonical (str): CourseCache key the data is reported under. If it is itself an alias, its canonical is used.
+
+        Raises:
+            ValueError: if this would make a course an alias of itself
+        """
+        canonical = self.resolve(canonical)
+        if canonical == alias:
+            raise ValueError(f"{alias} can't be an alias of itself")
+        self.aliases[alias] = canonical
+        # anything that pointed at alias now points at its canonical, so lookups stay one step
+        for other, target in self.aliases.items():
+            if target == alias:
+                self.aliases[other] = canonical
+        self._members = None
+
+    def remove(self, alias: str):
+        self.aliases.pop(alias, None)
+        self._members = None
+
+    def resolve(self, course_code: str) -> str:
+        return self.aliases.get(course_code, course_code)
+
+    def members(self, course_code: str) -> list:
+        """Every code that resolves to the same course as course_code, canonical first"""
+        if self._members is None:
+            self._members = {}
+            for alias, canonical in sorted(self.aliases.items()):
+                self._members.setdefault(canonical, []).append(alias)
+        canonical = self.resolve(course_code)
+        return [canonical] + self._members.get(canonical, [])
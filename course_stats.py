@@ -0,0 +1,252 @@
+"""
+Batched statistics over the frequency histograms in the cache, for every course and instructor at once.
+
+A bare average from a section with three responses means very little, so besides the plain mean this gives:
+- a shrunk mean (pulled toward the catalogue-wide mean, less so the more responses there are)
+- a credible interval from the Dirichlet posterior of the answer distribution (or a classic multinomial bootstrap)
+- a trend slope, the response-weighted least squares change in score per year
+
+Everything is computed with NumPy over all groups together; there is no per-course Python loop after loading.
+Scores come from main.quality_mapping/main.workload_mapping.
+"""
+
+import numpy as np
+from main import quality_mapping, workload_mapping
+from section_record import SectionRecord, QUESTIONS
+from term_calendar import term_id
+
+# metric -> (cache key of the question, label -> score)
+METRICS = {
+    "quality": ("overall_quality_frequency", quality_mapping),
+    "workload": ("workload_frequency", workload_mapping),
+}
+
+
+class SectionTable:
+    """
+    Every section flattened into parallel arrays (one row per section):
+    counts[metric] is an (n_sections, 5) int array in score order, course_idx/instructor_idx index into
+    courses/instructors, and term_ids are the sections' term_calendar ids.
+    """
+    def __init__(self, counts, scores, course_idx, courses, instructor_idx, instructors, term_ids):
+        self.counts = counts
+        self.scores = scores
+        self.course_idx = course_idx
+        self.courses = courses
+        self.instructor_idx = instructor_idx
+        self.instructors = instructors
+        self.term_ids = term_ids
+
+    def __len__(self):
+        return len(self.course_idx)
+
+
+def load_sections(courses, metrics=("quality", "workload")) -> SectionTable:
+    """Flattens cache entries into a SectionTable
+
+    Args:
+        courses (iterable): (course_code, cache entry) pairs, e.g. cache.iter_courses() (which also combines cross-listings)
+        metrics (tuple, optional): keys of METRICS to load
+
+    Returns:
+        SectionTable: failed sections (None) are skipped
+    """
+    labels = {m: sorted(METRICS[m][1], key=METRICS[m][1].get) for m in metrics}
+    # SectionRecords already hold counts as an array, usable directly if their label order is score order
+    record_order = {m: dict(QUESTIONS)[METRICS[m][0]] == labels[m] for m in metrics}
+    rows = {m: [] for m in metrics}
+    course_idx, instructor_idx, term_ids = [], [], []
+    course_ids, instructor_ids = {}, {}
+
+    for course_code, entry in courses:
+        c = course_ids.setdefault(course_code, len(course_ids))
+        for period, sections in entry['data'].items():
+            tid = term_id(period)
+            for section in sections.values():
+                if section is None:
+                    continue  # failed download
+                instructor = section.get("instructor_name", "").strip() or "Unknown"
+                course_idx.append(c)
+                instructor_idx.append(instructor_ids.setdefault(instructor, len(instructor_ids)))
+                term_ids.append(tid)
+                for m in metrics:
+                    key = METRICS[m][0]
+                    if isinstance(section, SectionRecord) and record_order[m]:
+                        rows[m].append(section.question_counts(key))
+                    else:
+                        freq = section.get(key, {})
+                        rows[m].append([freq.get(label, 0) for label in labels[m]])
+
+    return SectionTable(
+        counts={m: np.array(rows[m], dtype=np.int64).reshape(-1, len(labels[m])) for m in metrics},
+        scores={m: np.array([METRICS[m][1][label] for label in labels[m]], dtype=np.float64) for m in metrics},
+        course_idx=np.array(course_idx, dtype=np.int64),
+        courses=list(course_ids),
+        instructor_idx=np.array(instructor_idx, dtype=np.int64),
+        instructors=list(instructor_ids),
+        term_ids=np.array(term_ids, dtype=np.int64),
+    )
+
+
+def group_totals(counts: np.ndarray, group_idx: np.ndarray, n_groups: int) -> np.ndarray:
+    """Sums section histograms per group, (n_sections, k) -> (n_groups, k)"""
+    totals = np.zeros((n_groups, counts.shape[1]), dtype=np.int64)
+    np.add.at(totals, group_idx, counts)
+    return totals
+
+
+def _prior(totals: np.ndarray, prior_mean_p=None) -> np.ndarray:
+    # answer distribution of everything pooled, what small groups get shrunk toward
+    if prior_mean_p is not None:
+        return np.asarray(prior_mean_p, dtype=np.float64)
+    pooled = totals.sum(axis=0).astype(np.float64)
+    return pooled / pooled.sum() if pooled.sum() else np.full(totals.shape[1], 1 / totals.shape[1])
+
+
+def means(totals: np.ndarray, scores: np.ndarray) -> np.ndarray:
+    """Plain response-weighted means (what main.py prints), NaN for groups with no responses"""
+    n = totals.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, totals @ scores / n, np.nan)
+
+
+def shrunk_means(totals: np.ndarray, scores: np.ndarray, prior_strength: float=5.0, prior_mean_p=None) -> np.ndarray:
+    """Posterior means under a Dirichlet prior worth prior_strength responses, centered on the pooled distribution
+
+    A group with n responses ends up n / (n + prior_strength) of the way from the catalogue mean to its own mean.
+    """
+    prior = _prior(totals, prior_mean_p)
+    n = totals.sum(axis=1)
+    return (totals @ scores + prior_strength * (prior @ scores)) / (n + prior_strength)
+
+
+def intervals(totals: np.ndarray, scores: np.ndarray, level: float=0.95, n_samples: int=2000, prior_strength: float=5.0,
+              method: str="bayes", seed=None, max_block: int=2**22) -> tuple:
+    """Interval for every group's mean score, all groups sampled together
+
+    Args:
+        totals (np.ndarray): (n_groups, k) answer counts
+        scores (np.ndarray): (k,) score of each answer
+        level (float, optional): interval coverage
+        n_samples (int, optional): draws per group
+        prior_strength (float, optional): pseudo-responses of the pooled distribution added to each group ("bayes" only)
+        method (str, optional): "bayes" samples the Dirichlet posterior of the answer distribution,
+                                "bootstrap" resamples each group's own responses (multinomial), which is degenerate for tiny groups
+        seed (optional): for np.random.default_rng
+        max_block (int, optional): most floats sampled at once, groups are processed in blocks to stay under it
+
+    Returns:
+        tuple: (low, high) arrays of shape (n_groups,), NaN for groups with no responses under "bootstrap"
+    """
+    rng = np.random.default_rng(seed)
+    totals = np.asarray(totals)
+    n_groups, k = totals.shape
+    low, high = np.full(n_groups, np.nan), np.full(n_groups, np.nan)
+    quantiles = [(1 - level) / 2, 1 - (1 - level) / 2]
+    alpha = totals + prior_strength * _prior(totals)
+    n = totals.sum(axis=1)
+    block = max(1, max_block // (n_samples * k))
+
+    for start in range(0, n_groups, block):
+        stop = min(start + block, n_groups)
+        if method == "bayes":
+            # Dirichlet draws for every group in the block at once: normalized gammas
+            draws = rng.standard_gamma(alpha[start:stop, None, :], size=(stop - start, n_samples, k))
+            p = draws / draws.sum(axis=2, keepdims=True)
+        elif method == "bootstrap":
+            has_data = n[start:stop] > 0
+            empirical = np.where(has_data[:, None], totals[start:stop] / np.maximum(n[start:stop], 1)[:, None], 1 / k)
+            resampled = rng.multinomial(n[start:stop, None], empirical[:, None, :], size=(stop - start, n_samples))
+            with np.errstate(invalid="ignore", divide="ignore"):
+                p = resampled / n[start:stop, None, None]
+        else:
+            raise ValueError(f'method should be "bayes" or "bootstrap", not "{method}"')
+
+        sample_means = p @ scores  # (groups in block, n_samples)
+        low[start:stop], high[start:stop] = np.quantile(sample_means, quantiles, axis=1)
+
+    return low, high
+
+
+def trend_slopes(counts: np.ndarray, scores: np.ndarray, term_pos: np.ndarray, group_idx: np.ndarray, n_groups: int) -> np.ndarray:
+    """Response-weighted least squares slope of score over time (score points per year) for every group
+
+    Args:
+        counts (np.ndarray): (n_sections, k) answer counts
+        scores (np.ndarray): (k,) score of each answer
+        term_pos (np.ndarray): (n_sections,) when each section ran in years, e.g. FA24 -> 24.75 (term_calendar id / 4)
+        group_idx (np.ndarray): (n_sections,) group of each section
+        n_groups (int): number of groups
+
+    Returns:
+        np.ndarray: (n_groups,) slopes, NaN where a group only has data from one term
+    """
+    w = counts.sum(axis=1).astype(np.float64)  # responses per section
+    y_sum = counts @ scores                    # sum of scores per section
+    x = term_pos
+
+    def per_group(values):
+        return np.bincount(group_idx, weights=values, minlength=n_groups)
+
+    W, Sx, Sy = per_group(w), per_group(w * x), per_group(y_sum)
+    Sxx, Sxy = per_group(w * x * x), per_group(x * y_sum)
+    denominator = W * Sxx - Sx * Sx
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(denominator > 1e-9, (W * Sxy - Sx * Sy) / denominator, np.nan)
+
+
+def summarize(table: SectionTable, metric: str="quality", by: str="course", since: str=None, **interval_kwargs) -> dict:
+    """Every statistic for every course (or instructor) in the table
+
+    Args:
+        table (SectionTable): from load_sections()
+        metric (str, optional): "quality" or "workload"
+        by (str, optional): "course" or "instructor"
+        since (str, optional): only use sections from this term on, e.g. "SP23" (like main.cutoff_term)
+        **interval_kwargs: passed to intervals() (level, n_samples, prior_strength, method, seed)
+
+    Returns:
+        dict: "keys" (course codes or instructor names) and arrays "n", "mean", "shrunk_mean", "low", "high", "slope"
+    """
+    if by == "course":
+        keys, group_idx = table.courses, table.course_idx
+    elif by == "instructor":
+        keys, group_idx = table.instructors, table.instructor_idx
+    else:
+        raise ValueError(f'by should be "course" or "instructor", not "{by}"')
+
+    counts, term_ids, scores = table.counts[metric], table.term_ids, table.scores[metric]
+    if since is not None:
+        mask = term_ids >= term_id(since)
+        counts, term_ids, group_idx = counts[mask], term_ids[mask], group_idx[mask]
+    term_pos = term_ids / 4  # in years (FA24 -> 24.75), so slopes come out per year
+
+    totals = group_totals(counts, group_idx, len(keys))
+    prior_strength = interval_kwargs.get("prior_strength", 5.0)
+    low, high = intervals(totals, scores, **interval_kwargs)
+    return {
+        "keys": keys,
+        "n": totals.sum(axis=1),
+        "mean": means(totals, scores),
+        "shrunk_mean": shrunk_means(totals, scores, prior_strength),
+        "low": low,
+        "high": high,
+        "slope": trend_slopes(counts, scores, term_pos, group_idx, len(keys)),
+    }
+
+
+if __name__ == "__main__":
+    import time
+    from CourseCache import CourseCache
+    from course_aliases import AliasIndex
+
+    cache = CourseCache(compact=True, aliases=AliasIndex())
+    start = time.perf_counter()
+    table = load_sections(cache.iter_courses())
+    summary = summarize(table, "quality", by="course")
+    print(f"{len(table)} sections, {len(table.courses)} courses in {time.perf_counter() - start:.2f}s\n")
+
+    order = np.argsort(-np.nan_to_num(summary["low"], nan=-np.inf))[:20]
+    print("Top courses by lower bound of overall quality:")
+    for i in order:
+        print(f"  {summary['keys'][i]:<16} {summary['shrunk_mean'][i]:.2f} [{summary['low'][i]:.2f}, {summary['high'][i]:.2f}]  n={summary['n'][i]}")
@@ -1,30 +1,66 @@
-from CourseCache import CourseCache
+from CourseCache import iter_cache_file, format_cache_entry, CacheFileWriter
+from itertools import islice
 
 
-def make_cache_nice(cache_file='cache.json', output_file='nice_cache.json'):
-    cache = CourseCache(cache_file)
+def _make_entry_nice(entry):
+    """Returns the nice version of a cache entry, or None if the course should be dropped"""
+    # intersession and summer was too much to deal with and honestly:
+    # it's probably valuable to think of them as seperated like I have them right now, anyways.
 
-    sanity_check = []
-    
-    # modify in place because it's easy:
-    for key in list(cache.data.keys()):
-        # intersession and summer was too much to deal with and honestly:
-        # it's probably valuable to think of them as seperated like I have them right now, anyways.
+    if not entry['metadata']["relevant_periods"]:
+        return None
 
-        if not cache.data[key]['metadata']["relevant_periods"]:
-            del cache.data[key]
-            continue
+    # only metadata not easily extractable from data.
+    # in fact, this is pretty interesting becaeuse it allows you to extrapolate which periods they did NOT run.
+    entry["first_period_gathered"] = entry['metadata']["first_period_gathered"]
+    entry["last_period_gathered"] = entry['metadata']["last_period_gathered"]
+    del entry['metadata']
+    return entry
 
-        
-        # only metadata not easily extractable from data.
-        # in fact, this is pretty interesting becaeuse it allows you to extrapolate which periods they did NOT run.
-        cache.data[key]["first_period_gathered"] = cache.data[key]['metadata']["first_period_gathered"]
-        cache.data[key]["last_period_gathered"] = cache.data[key]['metadata']["last_period_gathered"]
-        del cache.data[key]['metadata']
 
-    new_cache = CourseCache(output_file)
-    new_cache.data = cache.data
-    new_cache.save()
+def _make_shard_nice(shard):
+    # runs in a worker process, so it returns finished text (serializing is most of the work)
+    formatted = []
+    for key, entry in shard:
+        entry = _make_entry_nice(entry)
+        if entry is not None:
+            formatted.append(format_cache_entry(key, entry))
+    return formatted
+
+
+def _shards(entries, shard_size):
+    entries = iter(entries)
+    while shard := list(islice(entries, shard_size)):
+        yield shard
+
+
+def make_cache_nice(cache_file='cache.json', output_file='nice_cache.json', workers=1, shard_size=256):
+    """Streams cache_file into output_file, dropping courses that never ran and flattening metadata
+
+    Only about workers * shard_size courses are in memory at once, so this works on caches far bigger than RAM.
+
+    Args:
+        cache_file (str, optional): raw cache, as written by CourseCache
+        output_file (str, optional): where to write the nice cache
+        workers (int, optional): processes to transform shards in, 1 means do it all in this process
+        shard_size (int, optional): courses per shard
+    """
+    shards = _shards(iter_cache_file(cache_file), shard_size)
+
+    with CacheFileWriter(output_file) as writer:
+        if workers <= 1:
+            for shard in shards:
+                for formatted in _make_shard_nice(shard):
+                    writer.write_formatted(formatted)
+            return
+
+        from multiprocessing import Pool
+        with Pool(workers) as pool:
+            # submit a window of shards at a time (Pool.imap would read the whole input up front), and write them back in order
+            while window := list(islice(shards, workers * 2)):
+                for formatted_shard in pool.map(_make_shard_nice, window):
+                    for formatted in formatted_shard:
+                        writer.write_formatted(formatted)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,124 @@
+"""
+Persistent index of failed downloads (failure_index.json), so finding pending work doesn't mean scanning every cache entry.
+
+Entries look like {course_code: {term: {"section": first section to retry, "kind": why it failed, "attempts": n}}}.
+A CourseCache created with failure_index=FailureIndex() keeps it up to date in mark_failed() and save(). If the cache
+file was saved by something that didn't, the stamp won't match and the index is rebuilt from one full scan.
+"""
+
+import json
+import os
+from CourseCache import CourseCache, resolve_cache_path
+
+# why a download failed, see classify_failure()
+TIMEOUT = "timeout"
+MISSING_BUTTON = "missing_button"
+HTTP_ERROR = "http_error"
+NO_PDF_URL = "no_pdf_url"
+UNKNOWN = "unknown"
+
+
+def classify_failure(exc: Exception) -> str:
+    """Which kind an exception from scrape_pdf() is (by name, so selenium/requests don't need importing)"""
+    names = {cls.__name__ for cls in type(exc).__mro__}
+    if "TimeoutException" in names or "Timeout" in names:
+        return TIMEOUT
+    if "NoSuchElementException" in names:
+        return MISSING_BUTTON  # the pdf button wasn't on the results page
+    if "RequestException" in names:
+        return HTTP_ERROR
+    return UNKNOWN
+
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def scan_failures(cache: CourseCache) -> dict:
+    """Finds every failed period by scanning every cache entry (what manage_failed_downloads.py used to do every run)
+
+    Returns:
+        dict: {course_code: {term: {"section": first section to retry, "kind": UNKNOWN, "attempts": 0}}}
+    """
+    failures = {}
+    for course_code, course_entry in cache.data.items():
+        metadata = course_entry['metadata']
+        data = course_entry['data']
+        for fail in metadata['failed_periods']:
+            if fail is None:
+                continue  # placeholder from ensure_course() on a brand new course, not a real period
+            if fail in metadata['relevant_periods']:  # this means it failed in such a way that it "mark_failed" was called on it
+                failed_sections = [key for key, value in data.get(fail, {}).items() if value is None]
+                section = int(min(failed_sections).split('.')[3]) if failed_sections else 1
+            else:
+                # sections are initialized without the later code actually filling them in, so they're left in failed until then
+                section = 1
+            failures.setdefault(course_code, {})[fail] = {"section": section, "kind": UNKNOWN, "attempts": 0}
+    return failures
+
+
+class FailureIndex:
+    def __init__(self, path="failure_index.json"):
+        self.path = resolve_cache_path(path)
+        self.failures = {}
+        self.cache_stamp = None  # stat of the cache file as of the last sync
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return
+        self.failures = saved["failures"]
+        self.cache_stamp = saved["cache_stamp"]
+
+    def save(self, cache_path=None):
+        """Saves the index, and if cache_path is given, records that the index matches that file as it is now"""
+        if cache_path is not None:
+            self.cache_stamp = _file_stamp(cache_path)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"cache_stamp": self.cache_stamp, "failures": self.failures}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def is_current(self, cache_path) -> bool:
+        return self.cache_stamp is not None and self.cache_stamp == _file_stamp(cache_path)
+
+    def record(self, course_code: str, term: str, section: int, kind: str=UNKNOWN, attempts: int=1):
+        """attempts is how many downloads were tried before giving up, added to the running total"""
+        entry = self.failures.setdefault(course_code, {}).setdefault(term, {"section": section, "kind": kind, "attempts": 0})
+        if entry["attempts"] == 0 and attempts > 0:
+            # the first real failure replaces ensure_course()'s placeholder (section 1, nothing tried), since
+            # every section before this one was scraped fine
+            entry["section"] = section
+        else:
+            entry["section"] = min(entry["section"], section)
+        entry["kind"] = kind
+        entry["attempts"] += attempts
+
+    def advance(self, course_code: str, term: str, section: int):
+        """Records that everything before section in this term is done, so a restart picks up from there"""
+        if term in self.failures.get(course_code, {}):
+            self.failures[course_code][term]["section"] = section
+
+    def resolve(self, course_code: str, term: str):
+        periods = self.failures.get(course_code, {})
+        periods.pop(term, None)
+        if not periods:
+            self.failures.pop(course_code, None)
+
+    def pending(self) -> list:
+        """(course_code, term, first section to retry) for every unresolved failure"""
+        return [(course_code, term, entry["section"])
+                for course_code, periods in self.failures.items()
+                for term, entry in periods.items()]
+
+    def rebuild(self, cache: CourseCache):
+        """Recomputes the index with one full scan of the cache"""
+        self.failures = scan_failures(cache)
+        self.cache_stamp = None
@@ -0,0 +1,221 @@
+"""
+Record/replay for the scraper's HTTP traffic, so crawls can be rerun offline and deterministically (e.g. to compare
+GeneralClassScraper against refresh_planner.run_refresh() without touching evaluationkit).
+
+A cassette is a directory (default cassettes/default/) with:
+    bodies.bin  every distinct response body, zlib compressed, appended back to back
+    index.json  "METHOD url" -> status, headers and the sha256 of its body, plus sha256 -> (offset, length) in bodies.bin
+
+Browser traffic (the ReportPublic login and results pages) goes through selenium-wire interceptors, see
+make_driver(cassette=...) in page_parse.py, and PDF downloads go through Cassette.session().
+"""
+
+import hashlib
+import json
+import os
+import threading
+import zlib
+from CourseCache import resolve_cache_path
+
+RECORD = "record"
+REPLAY = "replay"
+
+
+class CassetteMiss(LookupError):
+    """A request that isn't in the cassette, while replaying"""
+
+
+class _ReplayedHeaders(dict):
+    # header lookups are case insensitive in requests, so they are here too
+    def get(self, key, default=None):
+        return super().get(key.lower(), default)
+
+    def __getitem__(self, key):
+        return super().__getitem__(key.lower())
+
+
+class ReplayedResponse:
+    """The parts of requests.Response the scraper uses"""
+    def __init__(self, url, status_code, headers, content):
+        self.url = url
+        self.status_code = status_code
+        self.headers = _ReplayedHeaders((k.lower(), v) for k, v in headers.items())
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise CassetteMiss(f"{self.status_code} replayed for {self.url}")
+
+
+class Cassette:
+    def __init__(self, path="cassettes/default", mode=REPLAY):
+        """
+        Args:
+            path (str, optional): cassette directory, relative to this file
+            mode (str, optional): RECORD (hit the network and store everything) or REPLAY (serve only from disk)
+        """
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f'mode should be "{RECORD}" or "{REPLAY}", not "{mode}"')
+        self.path = resolve_cache_path(path)
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._index_path = os.path.join(self.path, "index.json")
+        self._bodies_path = os.path.join(self.path, "bodies.bin")
+
+        if os.path.exists(self._index_path):
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            self.requests, self.bodies = index["requests"], index["bodies"]
+        elif mode == REPLAY:
+            raise FileNotFoundError(f"No cassette at {self.path}, record one first")
+        else:
+            self.requests, self.bodies = {}, {}
+
+        if mode == RECORD:
+            os.makedirs(self.path, exist_ok=True)
+            self._bodies_file = open(self._bodies_path, "ab")
+        else:
+            self._bodies_file = open(self._bodies_path, "rb")
+
+    @staticmethod
+    def _key(method, url):
+        return f"{method.upper()} {url}"
+
+    def record(self, method, url, status_code, headers, body: bytes):
+        sha256 = hashlib.sha256(body).hexdigest()
+        with self._lock:
+            if sha256 not in self.bodies:  # identical bodies (e.g. every "no records found" page) are stored once
+                compressed = zlib.compress(body)
+                self._bodies_file.seek(0, os.SEEK_END)
+                self.bodies[sha256] = [self._bodies_file.tell(), len(compressed)]
+                self._bodies_file.write(compressed)
+            self.requests[self._key(method, url)] = {"status": status_code, "headers": dict(headers), "body": sha256}
+
+    def lookup(self, method, url):
+        """(status code, headers, body) of a recorded request, None if it wasn't recorded"""
+        with self._lock:
+            entry = self.requests.get(self._key(method, url))
+            if entry is None:
+                return None
+            offset, length = self.bodies[entry["body"]]
+            self._bodies_file.seek(offset)
+            body = zlib.decompress(self._bodies_file.read(length))
+        return entry["status"], entry["headers"], body
+
+    def __len__(self):
+        return len(self.requests)
+
+    def save(self):
+        if self.mode != RECORD:
+            return
+        with self._lock:
+            self._bodies_file.flush()
+            tmp_path = self._index_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"requests": self.requests, "bodies": self.bodies}, f)
+            os.replace(tmp_path, self._index_path)
+
+    def close(self):
+        self.save()
+        self._bodies_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    # selenium-wire side, see make_driver(cassette=...)
+
+    def intercept_request(self, request):
+        """selenium-wire request interceptor: while replaying, answer from the cassette (and block anything not in it)"""
+        if self.mode != REPLAY:
+            return
+        hit = self.lookup(request.method, request.url)
+        if hit is None:
+            request.abort(error_code=404)
+            return
+        status, headers, body = hit
+        request.create_response(status_code=status, headers=headers, body=body)
+
+    def record_response(self, request, response):
+        """selenium-wire response interceptor: while recording, store every response the browser gets"""
+        if self.mode == RECORD:
+            self.record(request.method, request.url, response.status_code, response.headers.items(), response.body or b"")
+
+    # requests side
+
+    def session(self, session=None):
+        """Something to pass wherever scrape_pdf() takes a requests.Session"""
+        return CassetteSession(self, session)
+
+
+class CassetteSession:
+    """Wraps a requests.Session: records its GETs, or replays them without any network"""
+    def __init__(self, cassette: Cassette, session=None):
+        self.cassette = cassette
+        self._session = session
+
+    def get(self, url, **kwargs):
+        if self.cassette.mode == REPLAY:
+            hit = self.cassette.lookup("GET", url)
+            if hit is None:
+                raise CassetteMiss(f"GET {url} isn't in the cassette")
+            status, headers, body = hit
+            return ReplayedResponse(url, status, headers, body)
+
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        response = self._session.get(url, **kwargs)
+        self.cassette.record("GET", url, response.status_code, response.headers.items(), response.content)
+        return response
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+if __name__ == "__main__":
+    # python http_cassette.py record EN.601.226 EN.553.171
+    # python http_cassette.py replay EN.601.226 EN.553.171   (same crawl from disk, e.g. to time a change to the scraper)
+    import shutil
+    import sys
+    import time
+    from CourseCache import CourseCache
+    from page_parse import make_driver, scrape_period
+
+    mode, courses = sys.argv[1], sys.argv[2:]
+    with Cassette(mode=mode) as cassette:
+        scratch = os.path.join(cassette.path, "scratch")  # a fresh cache every run, so nothing is skipped as already cached
+        shutil.rmtree(scratch, ignore_errors=True)
+        os.makedirs(scratch)
+        cache = CourseCache(os.path.join(scratch, "cache.json"))
+
+        # scrape_period() directly rather than GeneralClassScraper, which skips courses it thinks are up to date
+        # (a brand new entry already counts as gathered through the last period)
+        driver = make_driver(cassette=cassette)
+        start = time.perf_counter()
+        try:
+            with cassette.session() as session:
+                for course in courses:
+                    cache.ensure_course(course)
+                    for term in cache.calendar.recent_terms():
+                        scrape_period(cache, course, term[:2], term[2:], driver, session, save=False)
+        finally:
+            driver.quit()
+        print(f"{mode}: {len(courses)} courses in {time.perf_counter() - start:.1f}s, {len(cassette)} requests in the cassette")
+        if mode == RECORD and not len(cassette):
+            print("⚠️ Nothing was recorded")
@@ -1,6 +1,10 @@
 import json
+import math
 import os
 from page_parse import GeneralClassScraper
+from CourseCache import CourseCache
+from course_aliases import AliasIndex
+from term_calendar import term_id
 
 code = """
 EN.601.675
@@ -22,16 +26,6 @@ workload_mapping = {
     "Much heavier": 5
 }
 
-# Function to parse a term string into a comparable tuple.
-def parse_term(term_str):
-    # We assume the term string is of the form XXYY
-    # where "XX" is the term code (e.g. SP, FA, etc.)
-    # and "YY" are the last two digits of the year.
-    season_priority = {"SP": 1, "SU": 2, "FA": 3, "IN": -1}  # adjust if needed
-    season = term_str[:2]
-    year = int(term_str[2:])
-    return (year, season_priority.get(season, 0))
-
 # Function to compute the weighted sum and count from a frequency dict.
 def aggregate_frequency(freq, mapping):
     total_count = sum(freq.values())
@@ -44,103 +38,141 @@ def compute_avg(sum_count_pair):
     return s / count if count else None
 
 # Define cutoff for recent evaluations: files with term >= Spring 2023 (i.e., term code "SP23" or later)
-cutoff_term = (23, 1)  # (year, season_order), where Spring is given priority 1
-
-# Assume that you have a scraper instance 'g' that returns a list of file names.
-# For example: "data/EN.553.420.04.FA24"
-g = GeneralClassScraper(code)
-cache_entry = g.scrape_all_pdfs()  # returns list of file paths like "data/EN.553.420.04.FA24"
-
-# Create aggregation dictionaries.
-# Each instructor will have two sets of aggregates ("all" and "recent") for both quality and workload.
-instructor_data = {}
-# Also aggregate for the overall course (i.e. combining all files)
-overall_data_all   = {"quality": [0, 0], "workload": [0, 0]}   # [weighted_sum, total_count]
-overall_data_recent = {"quality": [0, 0], "workload": [0, 0]}
-
-for period, specific_courses_in_period in cache_entry['data'].items():
-    for specific_course, data in specific_courses_in_period.items():
-        # The file name is expected to have the format:
-        # data/[class code].[section].[date]
-        # Example: "data/EN.553.420.04.FA24"
-        # Strip the "data/" prefix and split based on '.'.
-        # The date is the last part (e.g. "FA24")
-        date_code = period
-        file_term = parse_term(date_code)
-        is_recent = (file_term >= cutoff_term)
-        
-        
-        # Get the instructor name (if missing or empty, use "Unknown").
-        if data is None:
-            print(f'{specific_course} skipped due to previous pdf download failure')
-            continue  # not ideal, temporary measure until we have better failure handling.
-        instructor = data.get("instructor_name", "").strip() or "Unknown"
-        
-        # Get the frequency distributions.
-        quality_freq = data.get("overall_quality_frequency", {})
-        workload_freq = data.get("workload_frequency", {})
+cutoff_term = term_id("SP23")  # terms from here on count as recent
+
+
+def aggregate_entry(cache_entry):
+    """Aggregates the quality/workload frequencies in a cache entry, per instructor and for the whole course
+
+    Args:
+        cache_entry (dict): a (cache entry)-style object, like what GeneralClassScraper.scrape_all_pdfs() returns
+
+    Returns:
+        tuple: (instructor_data, overall_data_all, overall_data_recent, course_name) where every aggregate is [weighted_sum, total_count]
+    """
+    # Create aggregation dictionaries.
+    # Each instructor will have two sets of aggregates ("all" and "recent") for both quality and workload.
+    instructor_data = {}
+    # Also aggregate for the overall course (i.e. combining all files)
+    overall_data_all   = {"quality": [0, 0], "workload": [0, 0]}   # [weighted_sum, total_count]
+    overall_data_recent = {"quality": [0, 0], "workload": [0, 0]}
+    course_name = None
+
+    for period, specific_courses_in_period in cache_entry['data'].items():
+        for specific_course, data in specific_courses_in_period.items():
+            # The file name is expected to have the format:
+            # data/[class code].[section].[date]
+            # Example: "data/EN.553.420.04.FA24"
+            # Strip the "data/" prefix and split based on '.'.
+            # The date is the last part (e.g. "FA24")
+            date_code = period
+            is_recent = term_id(date_code) >= cutoff_term
+            
+            
+            # Get the instructor name (if missing or empty, use "Unknown").
+            if data is None:
+                print(f'{specific_course} skipped due to previous pdf download failure')
+                continue  # not ideal, temporary measure until we have better failure handling.
+            instructor = data.get("instructor_name", "").strip() or "Unknown"
+            course_name = data.get("course_name")
+            
+            # Get the frequency distributions.
+            quality_freq = data.get("overall_quality_frequency", {})
+            workload_freq = data.get("workload_frequency", {})
+            
+            # Compute the weighted sums and response counts.
+            quality_sum, quality_count = aggregate_frequency(quality_freq, quality_mapping)
+            workload_sum, workload_count = aggregate_frequency(workload_freq, workload_mapping)
+            
+            # Initialize aggregation for this instructor if not seen yet.
+            if instructor not in instructor_data:
+                instructor_data[instructor] = {
+                    "all": {"quality": [0, 0], "workload": [0, 0]},
+                    "recent": {"quality": [0, 0], "workload": [0, 0]}
+                }
+            # Update "all time" aggregator for this instructor.
+            instructor_data[instructor]["all"]["quality"][0] += quality_sum
+            instructor_data[instructor]["all"]["quality"][1] += quality_count
+            instructor_data[instructor]["all"]["workload"][0] += workload_sum
+            instructor_data[instructor]["all"]["workload"][1] += workload_count
+
+            # Also update overall (class-wide) aggregator for "all" data.
+            overall_data_all["quality"][0] += quality_sum
+            overall_data_all["quality"][1] += quality_count
+            overall_data_all["workload"][0] += workload_sum
+            overall_data_all["workload"][1] += workload_count
+            
+            # If the file qualifies as recent (>= SP23), update the "recent" aggregates.
+            if is_recent:
+                instructor_data[instructor]["recent"]["quality"][0] += quality_sum
+                instructor_data[instructor]["recent"]["quality"][1] += quality_count
+                instructor_data[instructor]["recent"]["workload"][0] += workload_sum
+                instructor_data[instructor]["recent"]["workload"][1] += workload_count
+
+                overall_data_recent["quality"][0] += quality_sum
+                overall_data_recent["quality"][1] += quality_count
+                overall_data_recent["workload"][0] += workload_sum
+                overall_data_recent["workload"][1] += workload_count
+
+    return instructor_data, overall_data_all, overall_data_recent, course_name
+
+
+def print_averages(code, instructor_data, overall_data_all, overall_data_recent, course_name):
+    print(f"\n\nClass: {course_name}    Code: {code}\n\n")
+
+    # Print the aggregated averages.
+    print("Averages per instructor:")
+    for instructor, stats in instructor_data.items():
+        all_quality_avg = compute_avg(stats["all"]["quality"])
+        all_workload_avg = compute_avg(stats["all"]["workload"])
+        recent_quality_avg = compute_avg(stats["recent"]["quality"])
+        recent_workload_avg = compute_avg(stats["recent"]["workload"])
         
-        # Compute the weighted sums and response counts.
-        quality_sum, quality_count = aggregate_frequency(quality_freq, quality_mapping)
-        workload_sum, workload_count = aggregate_frequency(workload_freq, workload_mapping)
-        
-        # Initialize aggregation for this instructor if not seen yet.
-        if instructor not in instructor_data:
-            instructor_data[instructor] = {
-                "all": {"quality": [0, 0], "workload": [0, 0]},
-                "recent": {"quality": [0, 0], "workload": [0, 0]}
-            }
-        # Update "all time" aggregator for this instructor.
-        instructor_data[instructor]["all"]["quality"][0] += quality_sum
-        instructor_data[instructor]["all"]["quality"][1] += quality_count
-        instructor_data[instructor]["all"]["workload"][0] += workload_sum
-        instructor_data[instructor]["all"]["workload"][1] += workload_count
-
-        # Also update overall (class-wide) aggregator for "all" data.
-        overall_data_all["quality"][0] += quality_sum
-        overall_data_all["quality"][1] += quality_count
-        overall_data_all["workload"][0] += workload_sum
-        overall_data_all["workload"][1] += workload_count
-        
-        # If the file qualifies as recent (>= SP23), update the "recent" aggregates.
-        if is_recent:
-            instructor_data[instructor]["recent"]["quality"][0] += quality_sum
-            instructor_data[instructor]["recent"]["quality"][1] += quality_count
-            instructor_data[instructor]["recent"]["workload"][0] += workload_sum
-            instructor_data[instructor]["recent"]["workload"][1] += workload_count
-
-            overall_data_recent["quality"][0] += quality_sum
-            overall_data_recent["quality"][1] += quality_count
-            overall_data_recent["workload"][0] += workload_sum
-            overall_data_recent["workload"][1] += workload_count
-
-
-print(f"\n\nClass: {data.get('course_name')}    Code: {code}\n\n")
-
-# Print the aggregated averages.
-print("Averages per instructor:")
-for instructor, stats in instructor_data.items():
-    all_quality_avg = compute_avg(stats["all"]["quality"])
-    all_workload_avg = compute_avg(stats["all"]["workload"])
-    recent_quality_avg = compute_avg(stats["recent"]["quality"])
-    recent_workload_avg = compute_avg(stats["recent"]["workload"])
-    
-    print(f"\nInstructor: {instructor}")
-    print(f"  All Time: Quality Average = {all_quality_avg:.2f}, Workload Average = {all_workload_avg:.2f}")
-    if stats["recent"]["quality"][1] > 0:
-        print(f"  Recent:   Quality Average = {recent_quality_avg:.2f}, Workload Average = {recent_workload_avg:.2f}")
+        print(f"\nInstructor: {instructor}")
+        print(f"  All Time: Quality Average = {all_quality_avg:.2f}, Workload Average = {all_workload_avg:.2f}")
+        if stats["recent"]["quality"][1] > 0:
+            print(f"  Recent:   Quality Average = {recent_quality_avg:.2f}, Workload Average = {recent_workload_avg:.2f}")
+        else:
+            print("  Recent:   No recent evaluation data.")
+
+    # Compute and print overall class averages.
+    overall_all_quality = compute_avg(overall_data_all["quality"])
+    overall_all_workload = compute_avg(overall_data_all["workload"])
+    overall_recent_quality = compute_avg(overall_data_recent["quality"])
+    overall_recent_workload = compute_avg(overall_data_recent["workload"])
+
+    print("\nOverall class averages:")
+    print(f"  All Time: Quality Average = {overall_all_quality:.2f}, Workload Average = {overall_all_workload:.2f}")
+    if overall_data_recent["quality"][1] > 0:
+        print(f"  Recent:   Quality Average = {overall_recent_quality:.2f}, Workload Average = {overall_recent_workload:.2f}")
     else:
         print("  Recent:   No recent evaluation data.")
 
-# Compute and print overall class averages.
-overall_all_quality = compute_avg(overall_data_all["quality"])
-overall_all_workload = compute_avg(overall_data_all["workload"])
-overall_recent_quality = compute_avg(overall_data_recent["quality"])
-overall_recent_workload = compute_avg(overall_data_recent["workload"])
-
-print("\nOverall class averages:")
-print(f"  All Time: Quality Average = {overall_all_quality:.2f}, Workload Average = {overall_all_workload:.2f}")
-if overall_data_recent["quality"][1] > 0:
-    print(f"  Recent:   Quality Average = {overall_recent_quality:.2f}, Workload Average = {overall_recent_workload:.2f}")
-else:
-    print("  Recent:   No recent evaluation data.")
+
+def print_intervals(code, cache_entry, level=0.95):
+    """Prints shrunk averages with credible intervals and trends (see course_stats.py), since bare averages of a few responses mean little"""
+    import course_stats  # numpy, and course_stats imports this file
+
+    table = course_stats.load_sections([(code, cache_entry)])
+    print(f"\nWith {level:.0%} intervals (shrunk toward the average of these sections, trend is change per year):")
+    for by in ("instructor", "course"):
+        quality = course_stats.summarize(table, "quality", by=by, level=level)
+        workload = course_stats.summarize(table, "workload", by=by, level=level)
+        for i, key in enumerate(quality["keys"]):
+            print(f"  {'Overall' if by == 'course' else key}: n={quality['n'][i]}")
+            for name, stats in (("Quality", quality), ("Workload", workload)):
+                trend = "n/a" if math.isnan(stats['slope'][i]) else f"{stats['slope'][i]:+.2f}/yr"  # NaN with only one term
+                print(f"    {name:<8} = {stats['shrunk_mean'][i]:.2f} [{stats['low'][i]:.2f}, {stats['high'][i]:.2f}], trend {trend}")
+
+
+if __name__ == "__main__":
+    # Assume that you have a scraper instance 'g' that returns a list of file names.
+    # For example: "data/EN.553.420.04.FA24"
+    cache = CourseCache(aliases=AliasIndex())
+    for member in cache.aliases.members(code):  # cross-listed codes get scraped too, and combined by get_course()
+        g = GeneralClassScraper(member, cache)
+        g.scrape_all_pdfs()  # returns list of file paths like "data/EN.553.420.04.FA24"
+    cache_entry = cache.get_course(code)
+
+    print_averages(code, *aggregate_entry(cache_entry))
+    print_intervals(code, cache_entry)
@@ -1,72 +1,227 @@
-from page_parse import SpecificClassScraper
+from page_parse import SpecificClassScraper, make_driver, RecyclingDriver, parse_report
 from CourseCache import CourseCache
+from section_record import SectionRecord
+from failure_index import FailureIndex, scan_failures, classify_failure
 from typing import List, Dict
-from seleniumwire import webdriver
-from selenium.webdriver.chrome.options import Options
+import json
+import os
+import random
+import threading
+import time
 
 
-def _find_courses_to_check_from_failed(cache: CourseCache) -> Dict[str, Dict[str, List[str]]]:
+def _find_courses_to_check_from_failed(cache: CourseCache) -> Dict[str, Dict[str, List[int]]]:
 
     specific_to_check = {}
-    
-    for course_code, course_entry in cache.data.items():
-        metadata = course_entry['metadata']
-        failed = metadata['failed_periods']
-        if not failed:
-            continue
-
-        specific_to_check[course_code] = {}
-
-        data = course_entry['data']
-        for fail in failed:
-            if fail in metadata['relevant_periods']:  # this means it failed in such a way that it "mark_failed" was called on it
-            
-                first_failed = min(key for key, value in data[fail].items() if value is None)
-
-                section = int(first_failed.split('.')[3])
-            else:
-                # new case I added where the problem is that sections are initialized without the later code actually filling them in, so i leave them in failed until then
-                section = 1
-
-            # create list of first specific course codes (entire code embedded in dictionary keys) within the failed period to check (up to section 99)
-            specific_to_check[course_code][fail] = [sec for sec in range(section, 100)]
-            # [f'{course_code}.{sec:02d}.{fail}' for sec in range(section, 100)]
+
+    for course_code, periods in scan_failures(cache).items():
+        # create list of first specific course codes (entire code embedded in dictionary keys) within the failed period to check (up to section 99)
+        specific_to_check[course_code] = {fail: [sec for sec in range(entry["section"], 100)] for fail, entry in periods.items()}
 
     return specific_to_check
 
 
 def solve_simple_failures(cache: CourseCache=None) -> CourseCache:
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_experimental_option("prefs", {
-        "download.prompt_for_download": False,
-        "download.directory_upgrade": True
-    })
-    driver = webdriver.Chrome(options=chrome_options)
-
     if cache is None:
         cache = CourseCache()
 
     d = _find_courses_to_check_from_failed(cache)
+    if not d:
+        return cache  # nothing failed, so don't bother starting chrome
+
+    driver = make_driver()
 
     for course_code, periods in d.items():
         for period, sections in periods.items():
             all_succeeded = True
             for sec in sections:
-                s = SpecificClassScraper(course_code, period[:2], period[2:], str(sec), cache, True)
+                s = SpecificClassScraper(course_code, period[:2], period[2:], str(sec), cache)
                 result = s.scrape_pdf(driver)
                 if result is None:
                     break
                 elif result is False:
                     all_succeeded = False
-                    cache.mark_failed(s.specific_class_code)
+                    cache.mark_failed(s.specific_class_code, kind=s.failure)
                     break
-                
+
                 cache = s.parse_pdf()
-            
+
             if all_succeeded:
-                cache.data[course_code]['metadata']['failed_periods'].remove(period)
+                cache.resolve_failed(course_code, period)
                 cache.save()
 
     return cache  # unecessary output because I think it updates in place but why not
+
+
+class _Journal:
+    """
+    Append-only log of recovery progress (recovery_journal.jsonl). Every finished section is one small line, flushed
+    right away, so a crash loses nothing even though the full cache is only saved every so often.
+    """
+    def __init__(self, path="recovery_journal.jsonl"):
+        self.path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+        self._file = None
+
+    def append(self, record: dict):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(record, default=lambda o: o.to_dict()) + "\n")
+        self._file.flush()
+
+    def replay(self, cache: CourseCache) -> int:
+        """Applies a leftover journal (from a run that didn't finish) to cache, returns how many records there were"""
+        if not os.path.exists(self.path):
+            return 0
+        count = 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # the write that was happening during the crash
+                course_code, term = record["course"], record["term"]
+                if "section" in record:
+                    cache.ensure_course(course_code, term)
+                    data = SectionRecord.from_dict(record["section"]) if cache.compact else record["section"]
+                    cache.data[course_code]['data'][term][record["specific"]] = data
+                    if term not in cache.data[course_code]['metadata']['relevant_periods']:
+                        cache.data[course_code]['metadata']['relevant_periods'].append(term)
+                    if cache.failure_index is not None:
+                        cache.failure_index.advance(course_code, term, int(record["specific"].split('.')[3]) + 1)
+                elif "failed" in record:
+                    cache.mark_failed(record["failed"], intersession=course_code.endswith("|IN"), summer=course_code.endswith("|SU"),
+                                      kind=record["kind"], attempts=record.get("attempts", 1))
+                else:
+                    cache.resolve_failed(course_code, term)
+                count += 1
+        return count
+
+    def clear(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def recover_failures(cache: CourseCache=None, index: FailureIndex=None, workers: int=4, max_attempts: int=4,
+                     backoff: float=2.0, checkpoint_every: int=20, cassette=None) -> CourseCache:
+    """Retries every pending failure concurrently, each worker thread with its own Chrome driver
+
+    Args:
+        cache (CourseCache, optional): defaults to cache.json, with index attached as its failure_index
+        index (FailureIndex, optional): defaults to failure_index.json. Only rebuilt (full scan) if the cache was saved without it.
+        workers (int, optional): concurrent drivers
+        max_attempts (int, optional): tries per section before it's left failed (with its kind recorded in the index)
+        backoff (float, optional): wait backoff ** attempt seconds (plus jitter) between tries
+        checkpoint_every (int, optional): save the full cache after this many periods finish, the journal covers everything in between
+        cassette (http_cassette.Cassette, optional): record every worker's traffic into it, or replay it from it
+
+    Returns:
+        CourseCache: the updated cache
+    """
+    if index is None:
+        index = cache.failure_index if cache is not None and cache.failure_index is not None else FailureIndex()
+    if cache is None:
+        cache = CourseCache(failure_index=index)
+    cache.failure_index = index
+
+    journal = _Journal()
+    index_current = index.is_current(cache.path)
+    if journal.replay(cache):
+        print("Replayed unfinished recovery journal")
+    if not index_current:
+        index.rebuild(cache)
+    cache.save()
+    journal.clear()
+
+    tasks = index.pending()
+    if not tasks:
+        return cache
+
+    import requests
+    lock = threading.Lock()  # guards cache, index and journal
+    local = threading.local()
+    opened = []
+    finished = 0
+
+    def connection():
+        if not hasattr(local, "driver"):
+            local.driver = RecyclingDriver(cassette=cassette)
+            local.session = cassette.session() if cassette is not None else requests.Session()
+            with lock:
+                opened.append((local.driver, local.session))
+        return local.driver, local.session
+
+    def attempt(scraper):
+        driver, session = connection()
+        try:
+            return scraper.scrape_pdf(driver, session), scraper.failure
+        except Exception as e:
+            return False, classify_failure(e)
+
+    def recover(course_code, term, section):
+        nonlocal finished
+        special = course_code.endswith(("|IN", "|SU"))
+        for sec in range(section, 100):
+            for tries in range(max_attempts):
+                with lock:
+                    s = SpecificClassScraper(course_code, term[:2], term[2:], str(sec), cache)
+                result, kind = attempt(s)
+                if result is not False:
+                    break
+                if tries + 1 < max_attempts:
+                    time.sleep(backoff ** tries + random.uniform(0, 1))
+
+            if result is False:
+                with lock:
+                    cache.mark_failed(s.specific_class_code, intersession=course_code.endswith("|IN"), summer=course_code.endswith("|SU"),
+                                      kind=kind, attempts=tries + 1)
+                    journal.append({"course": course_code, "term": term, "failed": s.specific_class_code, "kind": kind, "attempts": tries + 1})
+                print(f"❌ Still failing ({kind}): {s.specific_class_code}")
+                return
+            if result is None:
+                if special:
+                    continue  # for special periods, we search through all 100
+                break
+
+            # pdfplumber is the slow part and only touches this section's own pdf, so it runs outside the lock
+            data = None if s.unchanged else parse_report(s.pdf_file, s.fingerprint["sha256"] if s.fingerprint else None)
+            with lock:  # writing into the cache can't overlap a checkpoint save
+                s.parse_pdf(save=False, data=data)
+                relevant = cache.data[course_code]['metadata']['relevant_periods']
+                if term not in relevant:
+                    relevant.append(term)
+                index.advance(course_code, term, sec + 1)
+                journal.append({"course": course_code, "term": term, "specific": s.specific_class_code,
+                                "section": cache.data[course_code]['data'][term][s.specific_class_code]})
+
+        with lock:
+            cache.resolve_failed(course_code, term)
+            journal.append({"course": course_code, "term": term})
+            finished += 1
+            if finished % checkpoint_every == 0:
+                cache.save()
+                journal.clear()
+                print(f"Checkpoint: {finished}/{len(tasks)} failed periods recovered")
+
+    from concurrent.futures import ThreadPoolExecutor
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for future in [pool.submit(recover, *task) for task in tasks]:
+                future.result()
+    finally:
+        with lock:
+            cache.save()
+            journal.clear()
+        for driver, session in opened:
+            session.close()
+            driver.quit()
+        if cassette is not None:
+            cassette.save()
+
+    return cache
+
+
+if __name__ == "__main__":
+    recover_failures()
@@ -2,24 +2,144 @@
 Uses classes for classes, where a class a scraper method that gets the relevant data from https://asen-jhu.evaluationkit.com/Report/Public/Results
 """
 
-from fake_datetime import datetime
+import hashlib
 import json
 import os
 import time
-from seleniumwire import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import requests
 import urllib.parse
 import re
 from CourseCache import CourseCache
+from section_record import SectionRecord
+from parse_cache import ParseCache, sha256_text
+from term_calendar import term_code, term_id
+import failure_index
 
 import logging
 logging.getLogger("pdfminer").setLevel(logging.ERROR)  # to avoid some annoying text being printed: "CropBox missing from /Page, defaulting to MediaBox"
-import pdfplumber
 
+# seleniumwire, selenium, requests and pdfplumber are imported inside the functions that use them.
+# they take a long time to import, and most uses of this file (cached lookups, analysis) never download or parse anything.
+
+
+PDF_URL_PATTERN = ".*Report/Public/Pdf.*"
+# things a long crawl never needs the browser to load
+BLOCKED_RESOURCES = ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.ico", "*.webp",
+                     "*.css", "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"]
+
+
+def make_driver(long_crawl=False, cassette=None):
+    """Starts the headless Chrome (selenium-wire) driver used by scrape_pdf()
+
+    Args:
+        long_crawl (bool, optional): set up for hours of scraping. selenium-wire only captures the PDF request (which
+                                     scrape_pdf() intercepts) and keeps at most a few in memory, and Chrome skips
+                                     images, stylesheets and fonts. See also RecyclingDriver.
+        cassette (http_cassette.Cassette, optional): record every page the browser loads into it, or replay them from it
+
+    Returns:
+        seleniumwire.webdriver.Chrome: the driver, caller is responsible for driver.quit()
+    """
+    from seleniumwire import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-gpu")
+    prefs = {
+        "download.prompt_for_download": False,
+        "download.directory_upgrade": True
+    }
+    if not long_crawl:
+        chrome_options.add_experimental_option("prefs", prefs)
+        driver = webdriver.Chrome(options=chrome_options)
+    else:
+        prefs["profile.managed_default_content_settings.images"] = 2
+        chrome_options.add_experimental_option("prefs", prefs)
+        driver = webdriver.Chrome(options=chrome_options, seleniumwire_options={
+            "request_storage": "memory",
+            "request_storage_max_size": 20,
+        })
+        if cassette is None:  # a cassette has to see every page
+            driver.scopes = [PDF_URL_PATTERN]  # nothing else is captured (or slowed down by the interceptor)
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_RESOURCES})
+
+    driver.cassette = cassette  # scrape_pdf()'s interceptor hands everything but the PDF request to it
+    if cassette is not None:
+        driver.request_interceptor = cassette.intercept_request
+        driver.response_interceptor = cassette.record_response
+    return driver
+
+
+def _process_tree_rss_mb(pid):
+    """Resident memory of a process and all its children (chromedriver -> Chrome's processes), None without psutil"""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    try:
+        root = psutil.Process(pid)
+        processes = [root] + root.children(recursive=True)
+    except psutil.NoSuchProcess:
+        return None
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except psutil.NoSuchProcess:
+            pass  # exited while we were looking
+    return total / 2**20
+
+
+class RecyclingDriver:
+    """
+    A long-crawl driver that replaces itself every max_pages pages, or once Chrome's memory passes max_rss_mb, so
+    multi-hour crawls don't slow down as Chrome leaks. Use it anywhere a driver is expected: it passes everything
+    through to the current driver, and scrape_pdf() tells it when each page is done.
+    RSS is only checked if psutil is installed, otherwise it's recycled on page count alone.
+    """
+    def __init__(self, max_pages=300, max_rss_mb=1500, check_rss_every=20, cassette=None):
+        object.__setattr__(self, "_settings", (max_pages, max_rss_mb, check_rss_every))
+        object.__setattr__(self, "_cassette", cassette)
+        object.__setattr__(self, "_driver", None)
+        object.__setattr__(self, "_pages", 0)
+        object.__setattr__(self, "_started", None)
+        object.__setattr__(self, "recycled", 0)
+
+    @property
+    def driver(self):
+        if self._driver is None:
+            object.__setattr__(self, "_driver", make_driver(long_crawl=True, cassette=self._cassette))
+            object.__setattr__(self, "_pages", 0)
+            object.__setattr__(self, "_started", time.perf_counter())
+        return self._driver
+
+    def __getattr__(self, name):
+        return getattr(self.driver, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.driver, name, value)  # e.g. request_interceptor
+
+    def page_done(self):
+        max_pages, max_rss_mb, check_rss_every = self._settings
+        object.__setattr__(self, "_pages", self._pages + 1)
+        del self._driver.requests  # whatever was captured is never looked at again
+
+        rss = None
+        if self._pages % check_rss_every == 0:
+            rss = _process_tree_rss_mb(self._driver.service.process.pid)
+        if self._pages >= max_pages or (rss is not None and rss > max_rss_mb):
+            rate = self._pages / (time.perf_counter() - self._started)
+            print(f"♻️ Recycling driver after {self._pages} pages ({rate:.2f} sections/s" + (f", {rss:.0f} MB)" if rss else ")"))
+            self.quit()
+            object.__setattr__(self, "recycled", self.recycled + 1)
+
+    def quit(self):
+        if self._driver is not None:
+            try:
+                self._driver.quit()
+            finally:
+                object.__setattr__(self, "_driver", None)
 
 
 def _parse_period(period_string: str, expecting_special=False) -> str:
@@ -93,6 +213,174 @@ def _parse_section(section_string: str) -> int:
         raise ValueError(f'Section, "{section_string}" is not valid')
 
 
+def extract_pdf_text(pdf_file: str) -> str:
+    """All the text pdfplumber finds in a pdf, pages separated by newlines (the slow part of parsing)"""
+    import pdfplumber
+
+    # Open the PDF and extract full text from all pages.
+    text = ""
+    with pdfplumber.open(pdf_file) as pdf:
+        for page in pdf.pages:
+            page_text = page.extract_text()
+            if page_text:
+                text += page_text + "\n"
+    return text
+
+
+def parse_report_text(text: str) -> dict:
+    """Parses the text of an evaluation report into the section dict stored in the cache (the regex stage, no pdf involved)"""
+    course_name = ""
+    instructor_name = ""
+
+    # Extract Course Name.
+    # Looks for a line like: "Course: EN.553.291.03.FA24 : Linear Algebra and Differential Equations"
+    course_match = re.search(r"\nCourse:\s*[^:]*:\s(.+)\n", text)
+    if course_match:
+        course_name = course_match.group(1).strip()
+
+    # Extract Instructor Name.
+    # This pattern assumes the instructor name appears on a line ending with "Instructor:"
+    instructor_match = re.search(r"\nInstructor:\s(.+)\n", text)
+    if instructor_match:
+        instructor_name = instructor_match.group(1).strip()
+
+    # Define helper function to get text of a question section.
+    def get_section(header, text):
+        header_pattern = re.escape(header)
+        m = re.search(header_pattern, text)
+        if m:
+            start = m.end()
+            # Look ahead for the next question header (a digit followed by " - ")
+            m2 = re.search(r"\n\s*\d+\s*-\s", text[start:])
+            if m2:
+                end = start + m2.start()
+                return text[start:end]
+            else:
+                return text[start:]
+        return ""
+
+    # Helper function to extract a dictionary of frequencies for given valid labels
+    # Looks for lines like "Label (x) frequency ..." and returns {Label: frequency, ...}
+    def extract_frequency(section_text, valid_labels):
+        freq = {}
+        for label in valid_labels:
+            # The regex looks for the label, then a parenthesized number, then spaces and the frequency number.
+            pattern = re.escape(label) + r"\s*\(\d+\)\s+(\d+)"
+            match = re.search(pattern, section_text)
+            if match:
+                freq[label] = int(match.group(1))
+            else:
+                freq[label] = 0
+        return freq
+
+    # Headers for each question
+    q1_header = "1 - The overall quality of this course is:"
+    q2_header = "2 - The instructor's teaching effectiveness is:"
+    q3_header = "3 - The intellectual challenge of this course is:"
+    q4_header = "4 - The teaching assistant for this course is:"
+    q5_header = "5 - Please enter the name of the TA you evaluated in question 4:"
+    q6_header = "6 - Feedback on my work for this course is useful:"
+    q7_header = "7 - Compared to other Hopkins courses at this level, the workload for this course is:"
+
+    # Get sections from the text.
+    section_q1 = get_section(q1_header, text)
+    section_q2 = get_section(q2_header, text)
+    section_q3 = get_section(q3_header, text)
+    section_q4 = get_section(q4_header, text)
+    section_q5 = get_section(q5_header, text)
+    section_q6 = get_section(q6_header, text)
+    section_q7 = get_section(q7_header, text)
+
+    # Define the valid labels (answer choices) you want to extract frequencies for.
+    q1_labels = ["Poor", "Weak", "Satisfactory", "Good", "Excellent"]
+    q2_labels = ["Poor", "Weak", "Satisfactory", "Good", "Excellent"]
+    q3_labels = ["Poor", "Weak", "Satisfactory", "Good", "Excellent"]
+    q4_labels = ["Poor", "Weak", "Satisfactory", "Good", "Excellent"]
+    # For question 6, the response options are different.
+    q6_labels = ["Disagree strongly", "Disagree somewhat", "Neither agree nor disagree", "Agree somewhat", "Agree strongly"]
+    # For question 7, the response options are:
+    q7_labels = ["Much lighter", "Somewhat lighter", "Typical", "Somewhat heavier", "Much heavier"]
+
+    # Extract frequency dictionaries.
+    overall_quality_frequency = extract_frequency(section_q1, q1_labels)
+    instructor_effectiveness_frequency = extract_frequency(section_q2, q2_labels)
+    intellectual_challenge_frequency = extract_frequency(section_q3, q3_labels)
+    ta_frequency = extract_frequency(section_q4, q4_labels)
+    feedback_frequency = extract_frequency(section_q6, q6_labels)
+    workload_frequency = extract_frequency(section_q7, q7_labels)
+
+    # Extract TA Names from question 5.
+    # It is assumed that each TA name is on a separate line starting with a hyphen.
+    ta_names = re.findall(r"-\s*(.+)", section_q5)
+    ta_names = [name.strip() for name in ta_names if name.strip()]
+
+    # Gather the extracted data into a dictionary.
+    return {
+        "course_name": course_name,
+        "instructor_name": instructor_name,
+        "overall_quality_frequency": overall_quality_frequency,
+        "instructor_effectiveness_frequency": instructor_effectiveness_frequency,
+        "intellectual_challenge_frequency": intellectual_challenge_frequency,
+        "ta_frequency": ta_frequency,
+        "ta_names": ta_names,
+        "feedback_frequency": feedback_frequency,
+        "workload_frequency": workload_frequency
+    }
+
+
+def parser_version() -> str:
+    """Hash of parse_report_text()'s code, so cached parse results are thrown out whenever the parser changes"""
+    global _parser_version
+    if _parser_version is None:
+        import inspect
+        _parser_version = hashlib.sha256(inspect.getsource(parse_report_text).encode("utf-8")).hexdigest()[:16]
+    return _parser_version
+
+
+_parser_version = None
+_default_parse_cache = None
+
+
+def parse_report(pdf_file: str, pdf_sha256: str=None, parse_cache=None) -> dict:
+    """extract_pdf_text() then parse_report_text(), skipping either stage if its result is already in the parse cache
+
+    Args:
+        pdf_file (str): the pdf
+        pdf_sha256 (str, optional): hash of the pdf's bytes if already known (e.g. from scrape_pdf()'s fingerprint)
+        parse_cache (ParseCache, optional): defaults to .parse_cache/ next to this file
+
+    Returns:
+        dict: the section dict
+    """
+    global _default_parse_cache
+    if parse_cache is None:
+        if _default_parse_cache is None:
+            _default_parse_cache = ParseCache()
+        parse_cache = _default_parse_cache
+
+    if pdf_sha256 is None:
+        with open(pdf_file, "rb") as f:
+            pdf_sha256 = hashlib.sha256(f.read()).hexdigest()
+
+    text = parse_cache.get_text(pdf_sha256)
+    if text is None:
+        text = extract_pdf_text(pdf_file)
+        parse_cache.put_text(pdf_sha256, text)
+
+    text_sha256 = sha256_text(text)
+    data = parse_cache.get_parsed(text_sha256, parser_version())
+    if data is None:
+        data = parse_report_text(text)
+        parse_cache.put_parsed(text_sha256, parser_version(), data)
+    return data
+
+
+def _without_fingerprint(section) -> dict:
+    d = section.to_dict() if isinstance(section, SectionRecord) else dict(section)
+    d.pop("fingerprint", None)
+    return d
+
+
 class SpecificClassScraper():
     """
     holds information of a specific class, and has a method to scrape the data for that class
@@ -113,6 +401,9 @@ class SpecificClassScraper():
         self.general_class_code = class_code
 
         self.pdf_file = None
+        self.failure = None  # why scrape_pdf() returned False, one of the kinds in failure_index.py
+        self.fingerprint = None  # {"sha256", "etag", "last_modified"} of the downloaded report, stored with the section
+        self.unchanged = False  # the report is the same as the one already cached, so parse_pdf() has nothing to do
 
         # The variables where pdf extracted data will be stored:
         self.course_name = ""
@@ -132,7 +423,30 @@ class SpecificClassScraper():
 
         self.cache.ensure_course(course_code=class_code, period=f'{period}{year:02}')
 
-    def scrape_pdf(self, driver):
+    def scrape_pdf(self, driver, session=None):
+        """Finds and downloads this section's PDF
+
+        Args:
+            driver: selenium-wire driver, e.g. from make_driver()
+            session (requests.Session, optional): reused for the PDF download, so a batch shares one connection pool.
+                                                  Can also be a http_cassette.CassetteSession.
+
+        Returns:
+            str | None | False: the downloaded file name, None if there is no evaluation for this section, False on failure
+        """
+        try:
+            return self._download_pdf(driver, session)
+        finally:
+            page_done = getattr(driver, "page_done", None)  # only RecyclingDriver has this
+            if page_done is not None:
+                page_done()
+
+    def _download_pdf(self, driver, session):
+        import requests
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+
         # print(f"Checking class code: {self.specific_class_code}:")
         pdf_url_holder = {"url": None}
 
@@ -142,6 +456,8 @@ class SpecificClassScraper():
                 # print("🚫 Blocking request to:", request.url)
                 pdf_url_holder["url"] = request.url
                 request.abort()  # <- prevent download
+            elif getattr(driver, "cassette", None) is not None:
+                driver.cassette.intercept_request(request)  # replaying, the page comes from disk
 
         driver.request_interceptor = interceptor
 
@@ -179,128 +495,99 @@ class SpecificClassScraper():
 
         if pdf_url_holder["url"]:
             # print("✅ Found PDF URL:", pdf_url_holder["url"])
-            response = requests.get(pdf_url_holder["url"])
+            file_name = f"pdfs/{self.specific_class_code.replace('.', '_')}.pdf"
+
+            # if this section is already cached, only download it if it changed
+            existing = self._cached_section()
+            known = existing.get("fingerprint") if existing is not None else None
+            headers = {}
+            if known and known.get("etag"):
+                headers["If-None-Match"] = known["etag"]
+            if known and known.get("last_modified"):
+                headers["If-Modified-Since"] = known["last_modified"]
+
+            response = (session or requests).get(pdf_url_holder["url"], headers=headers)
+            if response.status_code == 304:
+                print(f"Unchanged: {self.specific_class_code}")
+                self.unchanged = True
+                return file_name
             if response.status_code == 200:
-                file_name = f"pdfs/{self.specific_class_code.replace('.', '_')}.pdf"
+                fingerprint = {"sha256": hashlib.sha256(response.content).hexdigest()}
+                if response.headers.get("ETag"):
+                    fingerprint["etag"] = response.headers["ETag"]
+                if response.headers.get("Last-Modified"):
+                    fingerprint["last_modified"] = response.headers["Last-Modified"]
+                if known and known.get("sha256") == fingerprint["sha256"]:
+                    print(f"Unchanged: {self.specific_class_code}")
+                    self.unchanged = True
+                    return file_name
+
                 with open(file_name, 'wb') as f:
                     f.write(response.content)
                 print(f"Downloaded PDF as {file_name}")
                 self.pdf_file = file_name
+                self.fingerprint = fingerprint
                 return file_name
             else:
                 print(f"❌ Failed to download PDF: {self.specific_class_code}")
+                self.failure = failure_index.HTTP_ERROR
                 return False
         else:
             print(f"❌ No PDF URL intercepted: {self.specific_class_code}")
+            self.failure = failure_index.NO_PDF_URL
             return False
 
-    def parse_pdf(self):
-        # Open the PDF and extract full text from all pages.
-        text = ""
-        with pdfplumber.open(self.pdf_file) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-
-        # Extract Course Name.
-        # Looks for a line like: "Course: EN.553.291.03.FA24 : Linear Algebra and Differential Equations"
-        course_match = re.search(r"\nCourse:\s*[^:]*:\s(.+)\n", text)
-        if course_match:
-            self.course_name = course_match.group(1).strip()
-
-        # Extract Instructor Name.
-        # This pattern assumes the instructor name appears on a line ending with "Instructor:"
-        instructor_match = re.search(r"\nInstructor:\s(.+)\n", text)
-        if instructor_match:
-            self.instructor_name = instructor_match.group(1).strip()
-
-        # Define helper function to get text of a question section.
-        def get_section(header, text):
-            header_pattern = re.escape(header)
-            m = re.search(header_pattern, text)
-            if m:
-                start = m.end()
-                # Look ahead for the next question header (a digit followed by " - ")
-                m2 = re.search(r"\n\s*\d+\s*-\s", text[start:])
-                if m2:
-                    end = start + m2.start()
-                    return text[start:end]
-                else:
-                    return text[start:]
-            return ""
-
-        # Helper function to extract a dictionary of frequencies for given valid labels
-        # Looks for lines like "Label (x) frequency ..." and returns {Label: frequency, ...}
-        def extract_frequency(section_text, valid_labels):
-            freq = {}
-            for label in valid_labels:
-                # The regex looks for the label, then a parenthesized number, then spaces and the frequency number.
-                pattern = re.escape(label) + r"\s*\(\d+\)\s+(\d+)"
-                match = re.search(pattern, section_text)
-                if match:
-                    freq[label] = int(match.group(1))
-                else:
-                    freq[label] = 0
-            return freq
-
-        # Headers for each question
-        q1_header = "1 - The overall quality of this course is:"
-        q2_header = "2 - The instructor's teaching effectiveness is:"
-        q3_header = "3 - The intellectual challenge of this course is:"
-        q4_header = "4 - The teaching assistant for this course is:"
-        q5_header = "5 - Please enter the name of the TA you evaluated in question 4:"
-        q6_header = "6 - Feedback on my work for this course is useful:"
-        q7_header = "7 - Compared to other Hopkins courses at this level, the workload for this course is:"
-
-        # Get sections from the text.
-        section_q1 = get_section(q1_header, text)
-        section_q2 = get_section(q2_header, text)
-        section_q3 = get_section(q3_header, text)
-        section_q4 = get_section(q4_header, text)
-        section_q5 = get_section(q5_header, text)
-        section_q6 = get_section(q6_header, text)
-        section_q7 = get_section(q7_header, text)
-
-        # Define the valid labels (answer choices) you want to extract frequencies for.
-        q1_labels = ["Poor", "Weak", "Satisfactory", "Good", "Excellent"]
-        q2_labels = ["Poor", "Weak", "Satisfactory", "Good", "Excellent"]
-        q3_labels = ["Poor", "Weak", "Satisfactory", "Good", "Excellent"]
-        q4_labels = ["Poor", "Weak", "Satisfactory", "Good", "Excellent"]
-        # For question 6, the response options are different.
-        q6_labels = ["Disagree strongly", "Disagree somewhat", "Neither agree nor disagree", "Agree somewhat", "Agree strongly"]
-        # For question 7, the response options are:
-        q7_labels = ["Much lighter", "Somewhat lighter", "Typical", "Somewhat heavier", "Much heavier"]
-
-        # Extract frequency dictionaries.
-        self.overall_quality_frequency = extract_frequency(section_q1, q1_labels)
-        self.instructor_effectiveness_frequency = extract_frequency(section_q2, q2_labels)
-        self.intellectual_challenge_frequency = extract_frequency(section_q3, q3_labels)
-        self.ta_frequency = extract_frequency(section_q4, q4_labels)
-        self.feedback_frequency = extract_frequency(section_q6, q6_labels)
-        self.workload_frequency = extract_frequency(section_q7, q7_labels)
-
-        # Extract TA Names from question 5.
-        # It is assumed that each TA name is on a separate line starting with a hyphen.
-        self.ta_names = re.findall(r"-\s*(.+)", section_q5)
-        self.ta_names = [name.strip() for name in self.ta_names if name.strip()]
-        
-        # Gather the extracted data into a dictionary.
-        data = {
-            "course_name": self.course_name,
-            "instructor_name": self.instructor_name,
-            "overall_quality_frequency": self.overall_quality_frequency,
-            "instructor_effectiveness_frequency": self.instructor_effectiveness_frequency,
-            "intellectual_challenge_frequency": self.intellectual_challenge_frequency,
-            "ta_frequency": self.ta_frequency,
-            "ta_names": self.ta_names,
-            "feedback_frequency": self.feedback_frequency,
-            "workload_frequency": self.workload_frequency
-        }
-
+    def _cached_section(self):
+        """What the cache already has for this section (dict or SectionRecord), None if nothing or a failed download"""
+        period = self.specific_class_code.split('.')[4]
+        return self.cache.data[self.general_class_code]['data'].get(period, {}).get(self.specific_class_code)
+
+    def parse_pdf(self, save=True, data=None):
+        """Parses the downloaded PDF into this section's spot in the cache, then deletes the PDF
+
+        Does nothing if scrape_pdf() found the report unchanged. If the numbers differ from what was cached before,
+        the section is listed in the course's "amended_sections" metadata.
+
+        Args:
+            save (bool, optional): save the whole cache afterwards. Batch callers turn this off and save once in a while instead.
+            data (dict, optional): the section already parsed with parse_report(), so a caller can do the slow part outside a lock
+
+        Returns:
+            CourseCache: the (updated in place) cache
+        """
+        if self.unchanged:
+            return self.cache
+
+        # both stages are cached by content, so a report that was parsed before isn't parsed again
+        if data is None:
+            data = parse_report(self.pdf_file, self.fingerprint["sha256"] if self.fingerprint else None)
+        self.course_name = data["course_name"]
+        self.instructor_name = data["instructor_name"]
+        self.overall_quality_frequency = data["overall_quality_frequency"]
+        self.instructor_effectiveness_frequency = data["instructor_effectiveness_frequency"]
+        self.intellectual_challenge_frequency = data["intellectual_challenge_frequency"]
+        self.ta_frequency = data["ta_frequency"]
+        self.ta_names = data["ta_names"]
+        self.feedback_frequency = data["feedback_frequency"]
+        self.workload_frequency = data["workload_frequency"]
+
+        if self.fingerprint is not None:
+            data["fingerprint"] = self.fingerprint
+
+        existing = self._cached_section()
+        if existing is not None and _without_fingerprint(existing) != _without_fingerprint(data):
+            # the report was amended after it was first downloaded
+            print(f"⚠️ {self.specific_class_code} changed since it was cached")
+            amended = self.cache.data[self.general_class_code]['metadata'].setdefault("amended_sections", [])
+            if self.specific_class_code not in amended:
+                amended.append(self.specific_class_code)
+
+        if self.cache.compact:
+            data = SectionRecord.from_dict(data)
         self.cache.data[self.general_class_code]['data'][self.specific_class_code.split('.')[4]][self.specific_class_code] = data
 
-        self.cache.save()
+        if save:
+            self.cache.save()
 
         os.remove(self.pdf_file)
 
@@ -308,11 +595,64 @@ class SpecificClassScraper():
 
 
 
+def scrape_period(cache: CourseCache, class_code: str, period: str, year: int, driver, session=None, save=True, catch_errors=False) -> bool:
+    """Downloads and parses every section of class_code in one period, updating relevant_periods/failed_periods
+
+    Args:
+        cache (CourseCache): cache to add the sections to
+        class_code (str): CourseCache key (can end in |IN or |SU)
+        period (str): 'SP', 'FA', 'IN' or 'SU'
+        year (int): 2 or 4 digit year
+        driver: selenium-wire driver, shared across calls
+        session (requests.Session, optional): shared for PDF downloads
+        save (bool, optional): save the cache after every section (and on failure), like it always used to
+        catch_errors (bool, optional): treat an exception from a download (selenium/requests) as a failed section, instead of raising it
+
+    Returns:
+        bool: False if a download failed (it's marked failed for manage_failed_downloads.py), else True
+    """
+    special = period in ('IN', 'SU')
+    term = f'{period}{_parse_year(str(year)):02}'
+    for i in range(1, 100):
+        s = SpecificClassScraper(class_code, period, str(year), str(i), cache)
+        try:
+            result = s.scrape_pdf(driver, session)
+        except Exception as e:
+            if not catch_errors:
+                raise
+            print(f"❌ {type(e).__name__} while scraping {s.specific_class_code}")
+            s.failure = failure_index.classify_failure(e)
+            result = False
+        if result is None:
+            if special:
+                continue  # for special periods, we search through all 100
+            else:
+                break  # default behavior is we stop searching once we don't find a value
+        elif result is False:
+            cache.mark_failed(s.specific_class_code, intersession=period == 'IN', summer=period == 'SU', kind=s.failure)
+            if save:
+                cache.save()
+            return False  # manage_failed_downloads.py already deals with this well,
+                          # so if it fails we fully stop this period, continue onwards in solve_simple_failures()
+
+        s.parse_pdf(save=save)
+
+        relevant = cache.data[class_code]['metadata']["relevant_periods"]
+        if term not in relevant:
+            relevant.append(term)
+
+    # only after this for loop can we confirm nothing uncaught failed along the way:
+    cache.resolve_failed(class_code, term)
+    return True
+
+
 class GeneralClassScraper():
     """
     Contains SpecificClassScraper()s for all versions of a class in the last (default=5) years
     """   
-    def __init__(self, class_code: str, course_cache: CourseCache=None, years=5, intersession=False, summer=False):
+    def __init__(self, class_code: str, course_cache: CourseCache=None, years=5, intersession=False, summer=False, cassette=None):
+        """cassette (http_cassette.Cassette, optional) records or replays everything scrape_all_pdfs() downloads"""
+        self.cassette = cassette
         if course_cache is None:
             self.cache = CourseCache()
         else:
@@ -321,14 +661,7 @@ class GeneralClassScraper():
         self.years = years
         self.class_code = class_code
 
-        now = datetime.now()
-        self.last_year = now.year - 1
-        self.last_period = 'FA'
-        if now.month > 5:  # past may
-            self.last_year += 1  # it will make last year actually this year, but that represents the "last year that we have data from"
-            self.last_period = 'SP'
-        
-        self.date = self.last_period + str(self.last_year)[2:]
+        self.date = term_code(self.cache.calendar.last_completed())  # the last term that we have data from
 
         self.cache.ensure_course(course_code=class_code)
 
@@ -348,89 +681,35 @@ class GeneralClassScraper():
 
 
     def scrape_all_pdfs(self):
-        skip_first_semester = False
+        season = 'IN' if self.intersession else 'SU' if self.summer else None
+        terms = self.cache.calendar.recent_terms(self.years, season)
         if self.class_code in self.cache.data:
             course_entry = self.cache.data[self.class_code]
 
             last_date_gathered = course_entry['metadata']['last_period_gathered']
             if last_date_gathered == self.date:  # if the data is already gathered (at least for FA/SP)
                 return self.cache.data[self.class_code]
-            else:
-                # essentially a ceiling operation, so if it's been 0.5 years (1 semester) since we collected data, we set self.years to 1.
-                self.years = (self.last_year - 2000 - int(last_date_gathered[2:])) + int(self.last_period == 'FA' and last_date_gathered[:2] == 'SP')
-                if self.years < 1:
-                    raise ValueError(f'Something fishy is going on with years.\nLast date gathered: {last_date_gathered}\nCurrent Last Date Even Possible to Be Gathered: {self.date}')
-
-                # then we will tell the later code to skip the first semester if ceil(years passed) = ((years passed) + 0.5):
-                skip_first_semester = self.last_period != last_date_gathered[:2]
-                course_entry['metadata']["last_period_gathered"] = self.date
-                    
-
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_experimental_option("prefs", {
-            "download.prompt_for_download": False,
-            "download.directory_upgrade": True
-        })
-        driver = webdriver.Chrome(options=chrome_options)
+            if term_id(last_date_gathered) > term_id(self.date):
+                raise ValueError(f'Something fishy is going on with years.\nLast date gathered: {last_date_gathered}\nCurrent Last Date Even Possible to Be Gathered: {self.date}')
+
+            # only what came out since then, however long ago that was
+            terms = self.cache.calendar.new_terms(last_date_gathered, season)
+            course_entry['metadata']["last_period_gathered"] = self.date
+
+        driver = make_driver(cassette=self.cassette)
+        session = self.cassette.session() if self.cassette is not None else None
 
         try:
-            dates = []
-
-            start_year = (self.last_year + 1) - self.years
-
-            if self.intersession:
-                # possible changes:
-                # just search through sections and find it (slow, but not too many intersession courses and minimal work)
-                # add separate functionality to let user input section so you don't have to search as much (much more work, annoying for user)
-                dates = [("IN", year) for year in range(start_year, self.last_year + 1)]
-            elif self.summer:
-                spring_offset = -1 if self.last_period == 'SP' else 0
-                summer_year_range = range(start_year + spring_offset, self.last_year + spring_offset + 1)
-                dates = [("SU", year) for year in summer_year_range]
-            else:
-                if self.last_period == 'SP':
-                    dates.append(('FA', start_year - 1))
-                for year in range(start_year, self.last_year + 1):
-                    for period in ['SP', 'FA']:
-                        dates.append((period, year))
-                if self.last_period == 'SP':
-                    dates.pop()  # remove fall of last_year since it hasn't happened yet if last period is spring
-            
-
-            if skip_first_semester:
-                dates.pop(0)  # only can happen when dealing with downloading new evaluations when old evaluations were already downloaded
-            for period, year in dates:
-                first = True
-                for i in range(1, 100):
-                    s = SpecificClassScraper(self.class_code, period, str(year), str(i), self.cache)
-                    result = s.scrape_pdf(driver)
-                    if result is None:
-                        if self.intersession or self.summer:
-                            continue  # for special periods, we search through all 100
-                        else:
-                            break  # default behavior is we stop searching once we don't find a value
-                    elif result is False:
-                        self.cache.mark_failed(s.specific_class_code, intersession=self.intersession, summer=self.summer)
-                        self.cache.save()
-                        break  # manage_failed_downloads.py already deals with this well,
-                               # so if it fails we fully stop this period, continue onwards in solve_simple_failures()
-                    
-                    self.cache = s.parse_pdf()  # probably unnecessary to reassign, but why not
-
-                    if first:  # first has 1 purposes: not add to relevant_periods multiple times
-                        assert((period + str(year)[2:]) not in self.cache.data[self.class_code]['metadata']["relevant_periods"])  # should really never happen.
-                        self.cache.data[self.class_code]['metadata']["relevant_periods"].append(period + str(year)[2:])
-                        first = False
-                    
-                # only after this for loop can we confirm nothing uncaught failed along the way:
-                self.cache.data[self.class_code]['metadata']['failed_periods'].remove(period)
+            for term in terms:
+                scrape_period(self.cache, self.class_code, term[:2], term[2:], driver, session)
     
             self.cache.save()  # save runs even if they have no valid courses, to save the fact that we already checked that
 
         
         finally:
             driver.quit()
+            if session is not None:
+                session.close()
+                self.cassette.save()
         
         return self.cache.data[self.class_code]  # will error if there is an exception, which is probably fine.
@@ -0,0 +1,88 @@
+"""
+Two-level on-disk cache for PDF parsing (default .parse_cache/), so reruns skip work they've already done:
+    text/<sha256 of the pdf>.txt                      the text pdfplumber extracted (the slow part)
+    parsed/<sha256 of the text>-<parser version>.json  the section dict the regexes produced
+
+The parser version is a hash of the parsing code (see page_parse.parser_version()), so changing the parser only
+invalidates the second level. Files are evicted least recently used first once the cache passes max_bytes.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from CourseCache import resolve_cache_path
+
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ParseCache:
+    def __init__(self, path=".parse_cache", max_bytes=256 * 2**20):
+        self.root = resolve_cache_path(path)
+        self.max_bytes = max_bytes
+        self._size = None  # total bytes on disk, counted on first write
+        for level in ("text", "parsed"):
+            os.makedirs(os.path.join(self.root, level), exist_ok=True)
+
+    def get_text(self, pdf_sha256: str):
+        return self._read(os.path.join(self.root, "text", f"{pdf_sha256}.txt"))
+
+    def put_text(self, pdf_sha256: str, text: str):
+        self._write(os.path.join(self.root, "text", f"{pdf_sha256}.txt"), text)
+
+    def get_parsed(self, text_sha256: str, version: str):
+        content = self._read(os.path.join(self.root, "parsed", f"{text_sha256}-{version}.json"))
+        return None if content is None else json.loads(content)
+
+    def put_parsed(self, text_sha256: str, version: str, data: dict):
+        self._write(os.path.join(self.root, "parsed", f"{text_sha256}-{version}.json"), json.dumps(data))
+
+    def _read(self, path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+        os.utime(path)  # mtime doubles as the last use, for eviction
+        return content
+
+    def _files(self):
+        for level in ("text", "parsed"):
+            with os.scandir(os.path.join(self.root, level)) as entries:
+                for entry in entries:
+                    if entry.is_file() and not entry.name.endswith(".tmp"):
+                        st = entry.stat()
+                        yield st.st_mtime_ns, st.st_size, entry.path
+
+    def _write(self, path, content):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"  # recover_failures() parses on several threads at once
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._files())
+        else:
+            self._size += os.path.getsize(path)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self, target_bytes=None):
+        """Deletes least recently used files until the cache is under target_bytes (default 90% of max_bytes)"""
+        if target_bytes is None:
+            target_bytes = int(self.max_bytes * 0.9)
+        files = sorted(self._files())
+        self._size = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if self._size <= target_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._size -= size
+
+    def clear(self):
+        self.evict(target_bytes=0)
@@ -0,0 +1,120 @@
+"""
+Start-of-semester refresh for the whole cache at once.
+
+plan_refresh() works out exactly which (course, term) pairs are missing from every entry, and run_refresh() scrapes
+all of them as one batch with a single Chrome driver and HTTP session, instead of one GeneralClassScraper (and one
+Chrome) per course.
+"""
+
+from CourseCache import CourseCache
+from term_calendar import term_id, window
+
+
+def expected_terms(cache: CourseCache, course_code: str) -> list:
+    """Every term course_code should have been checked for, given the cache's current window of periods"""
+    if course_code.endswith(("|IN", "|SU")):
+        # the most recent intersession/summer terms at or before the cache's last period (what GeneralClassScraper would gather)
+        return window(term_id(cache.periods[-1]), len(cache.periods) // 2, (course_code[-2:],))
+    return list(cache.periods)
+
+
+def missing_terms(cache: CourseCache, course_code: str) -> list:
+    """Terms that haven't been gathered yet for one course, oldest first"""
+    last_gathered = term_id(cache.data[course_code]['metadata']['last_period_gathered'])
+    return [term for term in expected_terms(cache, course_code) if term_id(term) > last_gathered]
+
+
+def plan_refresh(cache: CourseCache) -> list:
+    """Scans the entire cache for missing work
+
+    Args:
+        cache (CourseCache): the cache to refresh
+
+    Returns:
+        list: sorted, deduplicated (course_code, term) pairs, e.g. ('EN.601.226', 'SP25')
+    """
+    plan = set()
+    for course_code in cache.data:
+        for term in missing_terms(cache, course_code):
+            plan.add((course_code, term))
+    return sorted(plan, key=lambda pair: (pair[0], term_id(pair[1])))
+
+
+def plan_recheck(cache: CourseCache, terms: list) -> list:
+    """(course_code, term) pairs for already gathered terms that had evaluations, e.g. to catch reports amended after a term closed
+
+    Sections that are already cached are only downloaded again if their fingerprint changed (see SpecificClassScraper.scrape_pdf()).
+
+    Args:
+        cache (CourseCache): the cache
+        terms (list): terms to recheck, e.g. cache.periods[-2:]
+
+    Returns:
+        list: sorted (course_code, term) pairs, can be combined with plan_refresh()'s before run_refresh()
+    """
+    terms = set(terms)
+    plan = {(course_code, term)
+            for course_code, entry in cache.data.items()
+            for term in entry['metadata']['relevant_periods'] if term in terms}
+    return sorted(plan, key=lambda pair: (pair[0], term_id(pair[1])))
+
+
+def run_refresh(cache: CourseCache=None, plan: list=None, save_every: int=25, cassette=None) -> CourseCache:
+    """Scrapes a refresh plan as one batch, sharing one driver and one HTTP session
+
+    Args:
+        cache (CourseCache, optional): defaults to cache.json
+        plan (list, optional): (course_code, term) pairs, defaults to plan_refresh(cache). Can include plan_recheck() pairs.
+        save_every (int, optional): save the cache after this many courses (and at the end), instead of after every section
+        cassette (http_cassette.Cassette, optional): record the crawl into it, or replay it from it without any network
+
+    Returns:
+        CourseCache: the updated cache
+    """
+    if cache is None:
+        cache = CourseCache()
+    if plan is None:
+        plan = plan_refresh(cache)
+    if not plan:
+        return cache
+
+    by_course = {}
+    for course_code, term in plan:
+        by_course.setdefault(course_code, set()).add(term)
+
+    from page_parse import RecyclingDriver, scrape_period
+    if cassette is not None:
+        session = cassette.session()
+    else:
+        import requests
+        session = requests.Session()
+
+    driver = RecyclingDriver(cassette=cassette)  # this can run for hours, see make_driver(long_crawl=True)
+    try:
+        with session:
+            for done, (course_code, terms) in enumerate(by_course.items(), start=1):
+                missing = missing_terms(cache, course_code)
+                for term in sorted(terms, key=term_id):
+                    # failures (including exceptions, so one bad section doesn't end the batch) are recorded in
+                    # failed_periods for manage_failed_downloads.py, same as GeneralClassScraper
+                    scrape_period(cache, course_code, term[:2], term[2:], driver, session, save=False, catch_errors=True)
+                if set(missing) <= terms:  # a plan with only rechecks doesn't make a course current
+                    cache.data[course_code]['metadata']['last_period_gathered'] = cache.periods[-1]
+
+                if done % save_every == 0:
+                    cache.save()
+                    print(f"Refreshed {done}/{len(by_course)} courses")
+    finally:
+        cache.save()
+        driver.quit()
+        if cassette is not None:
+            cassette.save()
+
+    return cache
+
+
+if __name__ == "__main__":
+    cache = CourseCache()
+    plan = plan_refresh(cache)
+    print(f"{len(plan)} missing (course, term) pairs across {len({course for course, _ in plan})} courses")
+    run_refresh(cache, plan)
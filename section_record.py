@@ -0,0 +1,132 @@
+"""
+Compact in-memory form of one section's evaluation (the dict SpecificClassScraper.parse_pdf() stores in the cache).
+
+The dict form costs a dict per question plus a string key per answer label, for what is really 30 small integers.
+SectionRecord keeps those integers in one array, interns the names, and converts back to the dict form for json.
+"""
+
+import sys
+from array import array
+
+# (cache key, answer labels in order) for every multiple choice question, in the order parse_pdf() writes them
+QUALITY_LABELS = ["Poor", "Weak", "Satisfactory", "Good", "Excellent"]
+FEEDBACK_LABELS = ["Disagree strongly", "Disagree somewhat", "Neither agree nor disagree", "Agree somewhat", "Agree strongly"]
+WORKLOAD_LABELS = ["Much lighter", "Somewhat lighter", "Typical", "Somewhat heavier", "Much heavier"]
+QUESTIONS = [
+    ("overall_quality_frequency", QUALITY_LABELS),
+    ("instructor_effectiveness_frequency", QUALITY_LABELS),
+    ("intellectual_challenge_frequency", QUALITY_LABELS),
+    ("ta_frequency", QUALITY_LABELS),
+    ("feedback_frequency", FEEDBACK_LABELS),
+    ("workload_frequency", WORKLOAD_LABELS),
+]
+N_ANSWERS = 5
+_QUESTION_INDEX = {key: i for i, (key, _) in enumerate(QUESTIONS)}
+
+
+def _pack_fingerprint(fingerprint):
+    # the dict form's {"sha256": hex, "etag": ..., "last_modified": ...} as a tuple, with the hash as raw bytes
+    if fingerprint is None:
+        return None
+    sha256 = fingerprint.get("sha256")
+    return (bytes.fromhex(sha256) if sha256 else None, fingerprint.get("etag"), fingerprint.get("last_modified"))
+
+
+def _unpack_fingerprint(packed):
+    if packed is None:
+        return None
+    sha256, etag, last_modified = packed
+    fingerprint = {"sha256": sha256.hex() if sha256 else None, "etag": etag, "last_modified": last_modified}
+    return {k: v for k, v in fingerprint.items() if v is not None}
+
+
+class SectionRecord:
+    """
+    One section's evaluation, stored as a fixed-length integer array (6 questions * 5 answers) plus interned strings.
+    Supports get()/[] with the same keys as the dict form, so code that reads sections works on either.
+    """
+    __slots__ = ("course_name", "instructor_name", "frequencies", "ta_names", "fingerprint", "extra")
+
+    def __init__(self, course_name, instructor_name, frequencies, ta_names=(), fingerprint=None, extra=None):
+        self.course_name = sys.intern(course_name)
+        self.instructor_name = sys.intern(instructor_name)
+        self.frequencies = frequencies  # array('I') of length len(QUESTIONS) * N_ANSWERS
+        self.ta_names = tuple(sys.intern(name) for name in ta_names)
+        self.fingerprint = _pack_fingerprint(fingerprint)  # (sha256 bytes, etag, last_modified) or None
+        self.extra = extra  # any other keys in the dict form, None if there are none (almost always)
+
+    @staticmethod
+    def is_section_dict(d) -> bool:
+        return isinstance(d, dict) and "overall_quality_frequency" in d and "course_name" in d
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "SectionRecord":
+        """Converts the dict form parse_pdf() produces
+
+        Raises:
+            ValueError: if a question has answer labels other than the expected ones (it wouldn't round trip)
+        """
+        frequencies = array("I")
+        for key, labels in QUESTIONS:
+            freq = d.get(key, {})
+            if any(label not in labels for label in freq):
+                raise ValueError(f"Unexpected answer labels for {key}: {list(freq)}")
+            frequencies.extend(freq.get(label, 0) for label in labels)
+
+        extra = {k: v for k, v in d.items() if k not in _QUESTION_INDEX and k not in ("course_name", "instructor_name", "ta_names", "fingerprint")}
+        return cls(d.get("course_name", ""), d.get("instructor_name", ""), frequencies, d.get("ta_names", ()), d.get("fingerprint"), extra or None)
+
+    def question_counts(self, key) -> array:
+        """Answer counts for one question (e.g. "workload_frequency"), in label order"""
+        i = _QUESTION_INDEX[key] * N_ANSWERS
+        return self.frequencies[i:i + N_ANSWERS]
+
+    def frequency(self, key) -> dict:
+        """The {label: count} dict for one question, like the dict form has"""
+        return dict(zip(QUESTIONS[_QUESTION_INDEX[key]][1], self.question_counts(key)))
+
+    def to_dict(self) -> dict:
+        d = {
+            "course_name": self.course_name,
+            "instructor_name": self.instructor_name,
+        }
+        # same key order as parse_pdf(), so a saved compact cache is identical to a saved dict cache
+        for key, _ in QUESTIONS[:4]:
+            d[key] = self.frequency(key)
+        d["ta_names"] = list(self.ta_names)
+        for key, _ in QUESTIONS[4:]:
+            d[key] = self.frequency(key)
+        if self.fingerprint is not None:
+            d["fingerprint"] = _unpack_fingerprint(self.fingerprint)
+        if self.extra:
+            d.update(self.extra)
+        return d
+
+    def __getitem__(self, key):
+        if key in _QUESTION_INDEX:
+            return self.frequency(key)
+        if key == "ta_names":
+            return list(self.ta_names)
+        if key in ("course_name", "instructor_name"):
+            return getattr(self, key)
+        if key == "fingerprint" and self.fingerprint is not None:
+            return _unpack_fingerprint(self.fingerprint)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __eq__(self, other):
+        if isinstance(other, SectionRecord):
+            other = other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self):
+        return f"SectionRecord({self.to_dict()!r})"
@@ -0,0 +1,89 @@
+"""
+Terms (e.g. "SP25") as integers, so ordering, ranges and cutoffs are just integer comparisons.
+
+A term's id is (two digit year) * 4 + its season's position in SEASONS, so IN25 = 100, SP25 = 101, SU25 = 102,
+FA25 = 103, and id / 4 is the term in years (what course_stats.py uses for trend slopes). Every id from IN00 to FA99
+is precomputed, so converting either way is one lookup.
+
+TermCalendar knows what "now" is (fake_datetime by default, like the rest of the repo), and so which terms have
+evaluations yet. Everything that used to do its own period math (CourseCache.periods, GeneralClassScraper,
+refresh_planner.py, main.cutoff_term, course_stats.py) goes through here.
+"""
+
+from fake_datetime import datetime
+
+SEASONS = ("IN", "SP", "SU", "FA")  # order within a calendar year
+REGULAR = ("SP", "FA")
+
+_CODES = [f"{season}{year:02}" for year in range(100) for season in SEASONS]
+_IDS = {code: i for i, code in enumerate(_CODES)}
+
+
+def term_id(term: str) -> int:
+    """'SP25' -> 101"""
+    try:
+        return _IDS[term]
+    except KeyError:
+        raise ValueError(f"{term} is not a term (should be IN/SP/SU/FA and a two digit year, like SP25)") from None
+
+
+def term_code(tid: int) -> str:
+    """101 -> 'SP25'"""
+    return _CODES[tid]
+
+
+def make_term_id(season: str, year: int) -> int:
+    """('SP', 2025) or ('SP', 25) -> 101"""
+    return (year % 100) * 4 + SEASONS.index(season)
+
+
+def window(last: int, count: int, seasons=REGULAR) -> list:
+    """The count most recent terms in seasons at or before the term id last, oldest first"""
+    wanted = {SEASONS.index(season) for season in seasons}
+    terms = []
+    tid = last
+    while len(terms) < count and tid >= 0:
+        if tid % 4 in wanted:
+            terms.append(_CODES[tid])
+        tid -= 1
+    return terms[::-1]
+
+
+def terms_between(after: int, through: int, seasons=REGULAR) -> list:
+    """Terms in seasons strictly after the term id after, up to and including through, oldest first"""
+    wanted = {SEASONS.index(season) for season in seasons}
+    return [_CODES[tid] for tid in range(max(after + 1, 0), through + 1) if tid % 4 in wanted]
+
+
+class TermCalendar:
+    def __init__(self, clock=None):
+        """
+        Args:
+            clock (callable, optional): returns something with .year and .month, defaults to fake_datetime's datetime.now
+        """
+        self.clock = datetime.now if clock is None else clock
+
+    def last_completed(self) -> int:
+        """Id of the latest SP/FA term with evaluations out: spring once it's past May, otherwise last fall"""
+        now = self.clock()
+        if now.month > 5:
+            return make_term_id("SP", now.year)
+        return make_term_id("FA", now.year - 1)
+
+    def recent_terms(self, years=5, season=None) -> list:
+        """The last years worth of terms with evaluations, oldest first
+
+        Args:
+            years (int, optional): how many years back
+            season (str, optional): "IN" or "SU" for one of those per year, otherwise 2 * years spring/fall terms
+
+        Returns:
+            list: term codes, e.g. ['FA20', 'SP21', ..., 'SP25']
+        """
+        if season is None:
+            return window(self.last_completed(), 2 * years)
+        return window(self.last_completed(), years, (season,))
+
+    def new_terms(self, last_gathered: str, season=None) -> list:
+        """Terms with evaluations that came out after last_gathered, oldest first (season as in recent_terms())"""
+        return terms_between(term_id(last_gathered), self.last_completed(), REGULAR if season is None else (season,))